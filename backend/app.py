@@ -1,44 +1,75 @@
+import asyncio
+import contextlib
 import time
 import urllib.parse
-from collections import Counter
 from collections.abc import Callable
 from contextlib import asynccontextmanager
-from datetime import datetime
 from io import BytesIO
+from pathlib import Path
 from typing import Literal
 
 import matplotlib as mpl
 import polars as pl
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse
 from matplotlib import pyplot as plt
-from pydantic import BaseModel
 from wordcloud import WordCloud
 
 from ml.comment_sentiment.ingestion import preprocess_comments
 
-from .routes import youtube
-from .utils import getenv, load_model
+from .inference import (
+    CommentInput,
+    CommentPrediction,
+    PredictionOutput,
+    SentimentCount,
+    SentimentType,
+    count_sentiments,
+    dedup_ratio,
+    predict_sentiment_proba,
+)
+from .registry import ModelRegistry, ResidentModel, get_model, watch_model_uri_file
+from .routes import admin, analyse, youtube
+from .store import AnalysisStore
+from .utils import getenv
 
 MLFLOW_MODEL_URI = getenv("MLFLOW_MODEL_URI")
-
-SentimentType = Literal["positive", "neutral", "negative"]
+# Optional file containing a model URI, polled to hot swap the default model
+MLFLOW_MODEL_URI_FILE = getenv("MLFLOW_MODEL_URI_FILE", "")
 
 mpl.use("Agg")  # Use a non-GUI backend for rendering plots
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
-    # Load model on startup to cache it
-    load_model(model_uri=MLFLOW_MODEL_URI)
+    # Load default model on startup so first request doesn't pay the cold start
+    registry: ModelRegistry = _app.state.models
+    registry.load_default()
+
+    watcher = None
+    if MLFLOW_MODEL_URI_FILE:
+        watcher = asyncio.create_task(
+            watch_model_uri_file(registry, Path(MLFLOW_MODEL_URI_FILE)),
+        )
     yield
+    if watcher:
+        watcher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await watcher
 
 
 app = FastAPI(
     title="YouTube Comment Sentiment Analyser - API",
     lifespan=lifespan,
 )
+app.state.models = ModelRegistry(
+    MLFLOW_MODEL_URI,
+    max_models=int(getenv("MAX_RESIDENT_MODELS", 3)),
+    idle_ttl=float(getenv("MODEL_IDLE_TTL", 3600)),
+)
+app.state.store = AnalysisStore(
+    Path(getenv("ANALYSIS_STORE_PATH", "data/analysis.sqlite3")),
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -95,48 +126,37 @@ async def verify_youtube_url(url: str):
     }
 
 
-class CommentInput(BaseModel):
-    text: str
-    timestamp: datetime | None = None
-
-
-class CommentPrediction(CommentInput):
-    sentiment: Literal[-1, 0, 1]
-
-
-class SentimentCount(BaseModel):
-    positive: int
-    neutral: int
-    negative: int
-
-
-class PredictionOutput(BaseModel):
-    comments: list[CommentPrediction]
-    sentiment_count: SentimentCount
-
-
 @app.post("/predict")
-async def predict(comments: list[CommentInput]) -> PredictionOutput:
-    pipeline = load_model(model_uri=MLFLOW_MODEL_URI)
+async def predict(
+    comments: list[CommentInput],
+    response: Response,
+    model: ResidentModel = Depends(get_model),
+) -> PredictionOutput:
+    pipeline = model.pipeline
+    response.headers["X-Model-URI"] = model.uri
     if not comments:
         raise HTTPException(400, "No comments provided.")
 
-    comments_df = pl.DataFrame([i.model_dump() for i in comments]).with_columns(
-        sentiment=pl.col("text")
-        .pipe(preprocess_comments)
-        .map_batches(pipeline.predict, pl.Int8, agg_list=True),
+    comments_df = (
+        pl.DataFrame([i.model_dump() for i in comments])
+        .with_columns(processed=pl.col("text").pipe(preprocess_comments))
+        .with_columns(
+            prediction=predict_sentiment_proba(
+                pipeline,
+                pl.col("processed"),
+                preprocessed=True,
+            ),
+        )
+        .unnest("prediction")
+    )
+    # share of comments which were not passed to the model
+    response.headers["X-Dedup-Ratio"] = str(
+        round(dedup_ratio(comments_df["processed"]), 4),
     )
-
-    # use Counter class to calc each sentiment count
-    sentiment_count = Counter(comments_df["sentiment"])
 
     return PredictionOutput(
         comments=[CommentPrediction(**i) for i in comments_df.iter_rows(named=True)],
-        sentiment_count=SentimentCount(
-            positive=sentiment_count.get(1, 0),
-            neutral=sentiment_count.get(0, 0),
-            negative=sentiment_count.get(-1, 0),
-        ),
+        sentiment_count=count_sentiments(comments_df["sentiment"]),
     )
 
 
@@ -199,3 +219,5 @@ async def comments_wordcloud(
 
 
 app.include_router(youtube.router)
+app.include_router(analyse.router)
+app.include_router(admin.router)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from statistics import NormalDist
+
+
+def z_score(confidence: float) -> float:
+    """Two sided critical value of standard normal distribution."""
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+@dataclass
+class Stratum:
+    population: int
+    sample_size: int
+    counts: dict[int, int]
+
+
+@dataclass
+class StratifiedEstimator:
+    """
+    Estimates proportion of each label from a stratified sample, where every
+    stratum (a page of comments) has a known population and a random sample of
+    it is labelled.
+
+    Uses the usual stratified estimator `p = sum(W_h * p_h)` with variance
+    `sum(W_h^2 * (1 - n_h/N_h) * p~_h * (1 - p~_h) / (n_h - 1))`, where
+    `p~_h = (x_h + 1) / (n_h + 2)` keeps strata whose sample has a single label
+    from adding zero variance.
+
+    `unsampled` comments (e.g. not fetched) have unknown labels, so they can be
+    anything and widen the bounds by their share of the population.
+    """
+
+    labels: tuple[int, ...]
+    strata: list[Stratum] = field(default_factory=list)
+    unsampled: int = 0
+
+    @property
+    def population(self) -> int:
+        """Population of sampled strata."""
+        return sum(i.population for i in self.strata)
+
+    @property
+    def sample_size(self) -> int:
+        return sum(i.sample_size for i in self.strata)
+
+    def add_stratum(self, population: int, sample: Iterable[int]) -> None:
+        counts = dict.fromkeys(self.labels, 0)
+        for label in sample:
+            counts[label] += 1
+        sample_size = sum(counts.values())
+        if not 0 < sample_size <= population:
+            raise ValueError("sample size must be in (0, population].")
+        self.strata.append(Stratum(population, sample_size, counts))
+
+    def proportion(self, label: int) -> tuple[float, float]:
+        """Estimated proportion of `label` in sampled strata and its variance."""
+        total = self.population
+        p = variance = 0.0
+        for stratum in self.strata:
+            weight = stratum.population / total
+            x_h, n_h = stratum.counts[label], stratum.sample_size
+            p += weight * x_h / n_h
+            if n_h > 1:
+                fpc = 1 - n_h / stratum.population
+                p_h = (x_h + 1) / (n_h + 2)
+                variance += weight**2 * fpc * p_h * (1 - p_h) / (n_h - 1)
+        return p, variance
+
+    def estimate(self, confidence: float) -> dict[int, tuple[float, float, float]]:
+        """Proportion with lower and upper bound of `confidence` interval."""
+        if not self.strata:
+            raise ValueError("no strata are added to estimate.")
+        z = z_score(confidence)
+        # share of the population whose labels are known from a sample
+        weight = self.population / (self.population + self.unsampled)
+        result = {}
+        for label in self.labels:
+            p, variance = self.proportion(label)
+            margin = z * math.sqrt(variance)
+            lower = weight * max(0.0, p - margin)
+            upper = weight * min(1.0, p + margin) + (1 - weight)
+            result[label] = (p, lower, upper)
+        return result
+
+    def margin_of_error(self, confidence: float) -> float:
+        """Largest distance of a bound from its proportion of all labels."""
+        return max(
+            max(p - lower, upper - p)
+            for p, lower, upper in self.estimate(confidence).values()
+        )
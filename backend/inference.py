@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Callable
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Literal
+
+import polars as pl
+from pydantic import BaseModel
+
+from ml.comment_sentiment.ingestion import preprocess_comments
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+SentimentType = Literal["positive", "neutral", "negative"]
+
+# model labels of each sentiment type
+SENTIMENT_LABELS: dict[SentimentType, int] = {
+    "positive": 1,
+    "neutral": 0,
+    "negative": -1,
+}
+
+_PREDICTION_SCHEMA = {"sentiment": pl.Int8, "confidence": pl.Float64}
+
+
+class CommentInput(BaseModel):
+    text: str
+    timestamp: datetime | None = None
+
+
+class CommentPrediction(CommentInput):
+    sentiment: Literal[-1, 0, 1]
+    # highest class probability, null if model doesn't implement `predict_proba`
+    confidence: float | None = None
+
+
+class SentimentCount(BaseModel):
+    positive: int
+    neutral: int
+    negative: int
+
+
+class PredictionOutput(BaseModel):
+    comments: list[CommentPrediction]
+    sentiment_count: SentimentCount
+
+
+def _model_input(text: pl.Series) -> pl.Series:
+    """
+    Preprocessed `text` with whitespace collapsed and stripped, which doesn't
+    change model features but makes e.g. "first 🔥" and "🔥 first" duplicates
+    and whitespace only texts empty.
+    """
+    return text.fill_null("").str.replace_all(r"\s+", " ").str.strip_chars()
+
+
+def _predict_distinct(
+    text: pl.Series,
+    predict: Callable[[pl.Series], dict[str, Any]],
+    schema: dict[str, pl.DataType],
+) -> pl.DataFrame:
+    """
+    Run `predict` once per distinct non-empty `_model_input` and join its
+    columns back to every row of `text`. Empty inputs (e.g. emoji only comments
+    after preprocessing) never reach the model and are neutral.
+    """
+    df = _model_input(text).to_frame("text").with_row_index()
+    distinct = df.select("text").unique().filter(pl.col("text") != "")
+    predictions = pl.DataFrame(
+        predict(distinct["text"]) if distinct.height else {},
+        schema=schema,
+    )
+    return (
+        df.join(distinct.hstack(predictions), on="text", how="left")
+        .sort("index")
+        .drop("index", "text")
+        .with_columns(pl.col("sentiment").fill_null(SENTIMENT_LABELS["neutral"]))
+    )
+
+
+def count_model_inputs(text: pl.Series) -> int:
+    """Number of preprocessed `text` passed to the model by `predict_sentiment`."""
+    model_input = _model_input(text)
+    return model_input.filter(model_input != "").n_unique()
+
+
+def dedup_ratio(text: pl.Series) -> float:
+    """Fraction of preprocessed `text` which is empty or a duplicate."""
+    if text.is_empty():
+        return 0.0
+    return 1 - count_model_inputs(text) / text.len()
+
+
+def predict_sentiment(
+    pipeline: Pipeline,
+    text: pl.Expr,
+    *,
+    preprocessed: bool = False,
+) -> pl.Expr:
+    """Expression which preprocess `text` and predicts its sentiment in one batch."""
+    if not preprocessed:
+        text = text.pipe(preprocess_comments)
+
+    def predict(series: pl.Series) -> pl.Series:
+        return _predict_distinct(
+            series,
+            lambda x: {"sentiment": pipeline.predict(x)},
+            {"sentiment": pl.Int8},
+        ).to_series()
+
+    return text.map_batches(predict, pl.Int8, agg_list=True)
+
+
+def predict_sentiment_proba(
+    pipeline: Pipeline,
+    text: pl.Expr,
+    *,
+    preprocessed: bool = False,
+) -> pl.Expr:
+    """Like `predict_sentiment` but returns a struct of `sentiment` and its
+    `confidence` (highest class probability).
+    """
+    if not preprocessed:
+        text = text.pipe(preprocess_comments)
+
+    def predict_proba(x: pl.Series) -> dict[str, Any]:
+        if not hasattr(pipeline, "predict_proba"):
+            return {"sentiment": pipeline.predict(x), "confidence": None}
+        proba = pipeline.predict_proba(x)
+        return {
+            "sentiment": pipeline.classes_[proba.argmax(axis=1)],
+            "confidence": proba.max(axis=1),
+        }
+
+    def predict(series: pl.Series) -> pl.Series:
+        return _predict_distinct(series, predict_proba, _PREDICTION_SCHEMA).to_struct()
+
+    return text.map_batches(predict, pl.Struct(_PREDICTION_SCHEMA), agg_list=True)
+
+
+def count_sentiments(sentiment: pl.Series) -> SentimentCount:
+    # use Counter class to calc each sentiment count
+    counts = Counter(sentiment)
+    return SentimentCount(
+        **{name: counts.get(label, 0) for name, label in SENTIMENT_LABELS.items()},
+    )
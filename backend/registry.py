@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import polars as pl
+from fastapi import Depends, HTTPException, Request
+from loguru import logger
+
+from .utils import load_model
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+# Small batch used to warm a freshly loaded model before it serves requests
+_WARMUP_COMMENTS = ["great video!", "this is so boring", "watching this today"]
+
+
+@dataclass
+class ResidentModel:
+    uri: str
+    pipeline: Pipeline
+    loaded_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class ModelRegistry:
+    """Keeps a bounded set of loaded models, one of them is the default.
+
+    New models are loaded and warmed in a worker thread and then swapped in
+    with a single dict assignment, so in-flight requests keep the pipeline they
+    already got. Non-default models are evicted when idle for `idle_ttl`
+    seconds or when more than `max_models` are resident (least recently used
+    first).
+
+    It is not thread-safe, use it from the event loop only (see `get_model`).
+    """
+
+    def __init__(
+        self,
+        default_uri: str,
+        *,
+        max_models: int = 3,
+        idle_ttl: float = 3600,
+        loader: Callable[[str], Pipeline] = load_model,
+    ) -> None:
+        if max_models < 1:
+            raise ValueError("max_models must be at least 1.")
+        self.default_uri = default_uri
+        self.max_models = max_models
+        self.idle_ttl = idle_ttl
+        self._loader = loader
+        self._models: dict[str, ResidentModel] = {}
+        self._lock = asyncio.Lock()
+
+    def _load_and_warm(self, uri: str) -> Pipeline:
+        pipeline = self._loader(uri)
+        pipeline.predict(pl.Series(_WARMUP_COMMENTS))
+        return pipeline
+
+    def load_default(self) -> None:
+        """Blocking load of the default model, used on startup."""
+        pipeline = self._load_and_warm(self.default_uri)
+        self._models[self.default_uri] = ResidentModel(self.default_uri, pipeline)
+
+    async def load(self, uri: str, *, make_default: bool = False) -> ResidentModel:
+        """Load (or reload) `uri` in background thread and swap it in."""
+        async with self._lock:
+            pipeline = await asyncio.to_thread(self._load_and_warm, uri)
+            model = ResidentModel(uri, pipeline)
+            self._models[uri] = model
+            if make_default:
+                self.default_uri = uri
+            self.evict()
+            return model
+
+    def unload(self, uri: str) -> None:
+        if uri == self.default_uri:
+            raise ValueError("default model can't be unloaded.")
+        self._models.pop(uri, None)
+
+    def evict(self) -> list[str]:
+        """Drop idle models and least recently used ones above `max_models`."""
+        now = time.monotonic()
+        candidates = sorted(
+            (i for i in self._models.values() if i.uri != self.default_uri),
+            key=lambda i: i.last_used,
+        )
+        evicted = [i.uri for i in candidates if now - i.last_used > self.idle_ttl]
+        n_over = len(self._models) - len(evicted) - self.max_models
+        evicted += [i.uri for i in candidates if i.uri not in evicted][: max(n_over, 0)]
+        for uri in evicted:
+            self._models.pop(uri, None)
+        return evicted
+
+    def get(self, uri: str | None = None) -> ResidentModel:
+        """Return a resident model, the default one if `uri` is not given."""
+        self.evict()
+        uri = uri or self.default_uri
+        if uri == self.default_uri and uri not in self._models:
+            self.load_default()
+        model = self._models.get(uri)
+        if model is None:
+            raise KeyError(uri)
+        model.last_used = time.monotonic()
+        return model
+
+    def status(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "uri": i.uri,
+                "default": i.uri == self.default_uri,
+                "loaded_at": i.loaded_at,
+                "idle_seconds": round(now - i.last_used, 3),
+            }
+            for i in self._models.values()
+        ]
+
+
+def get_model_registry(request: Request) -> ModelRegistry:
+    return request.app.state.models
+
+
+async def watch_model_uri_file(
+    registry: ModelRegistry,
+    path: Path,
+    interval: float = 10,
+) -> None:
+    """Poll `path` and hot swap the default model whenever its URI changes.
+
+    Every worker process runs its own watcher, so writing a new URI into the
+    file rolls out a model to all workers without restarting them.
+    """
+    last_mtime: float | None = None
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            mtime = path.stat().st_mtime
+            if mtime == last_mtime:
+                continue
+            last_mtime = mtime
+            uri = path.read_text().strip()
+            if uri and uri != registry.default_uri:
+                logger.info("Model URI changed in {!r}, loading {!r}.", path, uri)
+                await registry.load(uri, make_default=True)
+        except Exception:  # noqa: BLE001
+            # keep serving the current model if the new one can't be loaded
+            logger.exception("Hot reload from {!r} failed.", path)
+
+
+async def get_model(
+    model: str | None = None,
+    registry: ModelRegistry = Depends(get_model_registry),
+) -> ResidentModel:
+    """Resolve `model` query param to a resident model, default if not given.
+
+    It's async so FastAPI runs it on the event loop instead of the threadpool,
+    where concurrent requests would mutate the registry in parallel.
+    """
+    try:
+        return registry.get(model)
+    except KeyError:
+        raise HTTPException(404, f"Model {model!r} is not loaded.") from None
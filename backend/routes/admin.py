@@ -0,0 +1,69 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from pydantic import BaseModel
+
+from ..registry import ModelRegistry, get_model_registry
+from ..utils import getenv
+
+
+async def verify_admin_token(x_admin_token: str = Header()):
+    admin_token = getenv("ADMIN_TOKEN", "")
+    if not admin_token:
+        raise HTTPException(403, "Admin endpoints are disabled, set ADMIN_TOKEN env.")
+    if not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(401, "Invalid admin token.")
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+
+
+class ModelStatus(BaseModel):
+    uri: str
+    default: bool
+    loaded_at: float
+    idle_seconds: float
+
+
+class LoadModelInput(BaseModel):
+    uri: str
+    default: bool = True
+
+
+@router.get("/models")
+async def list_models(
+    registry: ModelRegistry = Depends(get_model_registry),
+) -> list[ModelStatus]:
+    return [ModelStatus(**i) for i in registry.status()]
+
+
+@router.post("/models")
+async def load_model(
+    body: LoadModelInput,
+    registry: ModelRegistry = Depends(get_model_registry),
+) -> list[ModelStatus]:
+    """
+    Loads and warms a model in background thread, then swaps it in. Requests
+    keep being served by the current models while it loads.
+    """
+    try:
+        await registry.load(body.uri, make_default=body.default)
+    except Exception as e:  # noqa: BLE001
+        raise HTTPException(400, f"Unable to load model {body.uri!r}: {e}") from None
+    return [ModelStatus(**i) for i in registry.status()]
+
+
+@router.delete("/models")
+async def unload_model(
+    uri: str,
+    registry: ModelRegistry = Depends(get_model_registry),
+) -> list[ModelStatus]:
+    try:
+        registry.unload(uri)
+    except ValueError as e:
+        raise HTTPException(400, str(e)) from None
+    return [ModelStatus(**i) for i in registry.status()]
@@ -0,0 +1,702 @@
+import asyncio
+import math
+import random
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Literal
+
+import httpx
+import polars as pl
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, NonNegativeInt, PositiveInt
+from wordcloud import STOPWORDS
+
+from ml.comment_sentiment.ingestion import preprocess_comments
+
+from ..estimation import StratifiedEstimator
+from ..inference import (
+    SENTIMENT_LABELS,
+    SentimentCount,
+    SentimentType,
+    count_model_inputs,
+    predict_sentiment,
+)
+from ..registry import ResidentModel, get_model
+from ..store import (
+    STORE_BUCKET,
+    AnalysisStore,
+    VideoAggregates,
+    get_analysis_store,
+)
+from ..utils import TokenBucket, getenv
+from .youtube import (
+    CommentDetails,
+    YouTubeClientFactory,
+    YTVideoDetails,
+    fetch_videos_details,
+    get_youtube_client,
+    iter_video_comments,
+    youtube_client_factory,
+)
+
+router = APIRouter(
+    prefix="/analyse",
+    tags=["analyse"],
+)
+
+_STOPWORDS = sorted(STOPWORDS)
+# Number of comments analysed at once by `/analyse/{video_id}`
+_ANALYSIS_CHUNK_SIZE = 5000
+
+
+class SentimentBucket(SentimentCount):
+    start: datetime
+
+
+class WordCount(BaseModel):
+    word: str
+    count: PositiveInt
+
+
+class CommentAnalysis(CommentDetails):
+    sentiment: Literal[-1, 0, 1]
+
+
+class VideoAnalysis(BaseModel):
+    video_id: str
+    totalComments: NonNegativeInt
+    sentiment_count: SentimentCount
+    sentiment_series: list[SentimentBucket]
+    top_words: dict[SentimentType, list[WordCount]]
+    comments: list[CommentAnalysis] | None = None
+    # share of comments whose text is empty or repeated within a scored chunk
+    dedupRatio: float = Field(ge=0, le=1)
+
+
+class StoredVideoAnalysis(VideoAnalysis):
+    newComments: NonNegativeInt
+    # `max_comments` were fetched without reaching stored (or the oldest)
+    # comments, so comments older than them are missing from the aggregates
+    hasGap: bool
+
+
+def sentiment_buckets(df: pl.DataFrame, every: str) -> pl.DataFrame:
+    """Count of each sentiment per `every` long time bucket of `publishedAt`."""
+    return (
+        df.select("publishedAt", "sentiment")
+        .drop_nulls("publishedAt")
+        .sort("publishedAt")
+        .group_by_dynamic("publishedAt", every=every)
+        .agg(
+            pl.col("sentiment").eq(label).sum().alias(name)
+            for name, label in SENTIMENT_LABELS.items()
+        )
+        .rename({"publishedAt": "start"})
+    )
+
+
+def merge_buckets(buckets: pl.DataFrame, every: str) -> pl.DataFrame:
+    """Merge `sentiment_buckets` output into longer `every` buckets."""
+    return (
+        buckets.sort("start")
+        .group_by_dynamic("start", every=every)
+        .agg(pl.col(list(SENTIMENT_LABELS)).sum())
+    )
+
+
+def word_counts(df: pl.DataFrame) -> pl.DataFrame:
+    """Count of (non stopword) words of preprocessed `text` per sentiment."""
+    return (
+        df.select("sentiment", word=pl.col("text").str.split(" "))
+        .explode("word")
+        .with_columns(pl.col("word").str.strip_chars("!?.,"))
+        .filter(
+            pl.col("word").str.len_chars() > 1,
+            pl.col("word").is_in(_STOPWORDS).not_(),
+        )
+        .group_by("sentiment", "word")
+        .agg(count=pl.len())
+    )
+
+
+def top_words(words: pl.DataFrame, n: int) -> dict[SentimentType, list[dict]]:
+    """Most frequent `n` words per sentiment from `word_counts` output."""
+    words = words.sort(["count", "word"], descending=[True, False])
+    return {
+        name: words.filter(pl.col("sentiment") == label)
+        .head(n)
+        .select("word", "count")
+        .to_dicts()
+        for name, label in SENTIMENT_LABELS.items()
+    }
+
+
+class AnalysisAccumulator:
+    """
+    Merges aggregates of analysed comments chunk by chunk, so memory is bounded
+    by the chunk size (plus vocabulary and at most `include_comments` rows)
+    instead of the number of comments.
+    """
+
+    def __init__(self, bucket: str, include_comments: int = 0) -> None:
+        self.bucket = bucket
+        self.include_comments = include_comments
+        self.n_comments = 0
+        self.n_model_inputs = 0
+        self._sentiment_count = dict.fromkeys(SENTIMENT_LABELS.values(), 0)
+        self._buckets: pl.DataFrame | None = None
+        self._words: pl.DataFrame | None = None
+        self._comments: list[dict] = []
+
+    @staticmethod
+    def _merge(
+        old: pl.DataFrame | None,
+        new: pl.DataFrame,
+        on: list[str],
+    ) -> pl.DataFrame:
+        if old is None:
+            return new
+        return pl.concat([old, new]).group_by(on).sum()
+
+    def restore(self, aggregates: VideoAggregates, comments: pl.DataFrame) -> None:
+        """Start from stored aggregates and latest `comments` to include."""
+        if self.bucket != STORE_BUCKET:
+            raise ValueError(f"stored aggregates have {STORE_BUCKET!r} buckets.")
+        self.n_comments = aggregates.n_comments
+        self.n_model_inputs = aggregates.n_model_inputs
+        self._sentiment_count = aggregates.sentiment_count.copy()
+        self._buckets = aggregates.buckets
+        self._words = aggregates.words
+        self._comments = comments.head(self.include_comments).drop("text").to_dicts()
+
+    def to_aggregates(self) -> VideoAggregates:
+        """Aggregates to store, must be accumulated in `STORE_BUCKET` buckets."""
+        if self.bucket != STORE_BUCKET:
+            raise ValueError(f"only {STORE_BUCKET!r} buckets can be stored.")
+        if self._buckets is None or self._words is None:
+            raise ValueError("no comments are added to store.")
+        return VideoAggregates(
+            n_comments=self.n_comments,
+            n_model_inputs=self.n_model_inputs,
+            sentiment_count=self._sentiment_count.copy(),
+            buckets=self._buckets,
+            words=self._words,
+        )
+
+    def update(self, df: pl.DataFrame) -> None:
+        """Add a chunk of `analyse_comments` output."""
+        self.n_comments += df.height
+        self.n_model_inputs += count_model_inputs(df["text"])
+        for label, count in df.group_by("sentiment").len().iter_rows():
+            self._sentiment_count[label] += count
+        self._buckets = self._merge(
+            self._buckets,
+            sentiment_buckets(df, self.bucket),
+            ["start"],
+        )
+        self._words = self._merge(self._words, word_counts(df), ["sentiment", "word"])
+        if (n := self.include_comments - len(self._comments)) > 0:
+            self._comments.extend(df.head(n).drop("text").to_dicts())
+
+    def summarize(
+        self,
+        video_id: str,
+        n_top_words: int,
+        bucket: str | None = None,
+    ) -> dict:
+        """
+        Aggregates in `VideoAnalysis` format, with sentiment series in longer
+        `bucket` buckets if given.
+        """
+        if self._buckets is None or self._words is None:
+            raise ValueError("no comments are added to summarize.")
+        buckets = self._buckets
+        if bucket and bucket != self.bucket:
+            buckets = merge_buckets(buckets, bucket)
+        return {
+            "video_id": video_id,
+            "totalComments": self.n_comments,
+            "sentiment_count": SentimentCount(
+                **{
+                    name: self._sentiment_count[label]
+                    for name, label in SENTIMENT_LABELS.items()
+                },
+            ),
+            "sentiment_series": buckets.sort("start").to_dicts(),
+            "top_words": top_words(self._words, n_top_words),
+            "comments": self._comments if self.include_comments else None,
+            "dedupRatio": 1 - self.n_model_inputs / self.n_comments,
+        }
+
+
+def analyse_comments(
+    df: pl.DataFrame,
+    model: ResidentModel,
+) -> pl.DataFrame:
+    """Add preprocessed `text` and predicted `sentiment` to comments dataframe."""
+    return df.with_columns(
+        pl.col("publishedAt").str.to_datetime(time_zone="UTC"),
+        text=pl.col("textDisplay").pipe(preprocess_comments),
+    ).with_columns(
+        sentiment=predict_sentiment(model.pipeline, pl.col("text"), preprocessed=True),
+    )
+
+
+def summarize_analysis(
+    video_id: str,
+    df: pl.DataFrame,
+    bucket: str,
+    n_top_words: int,
+    include_comments: int = 0,
+) -> dict:
+    """Aggregates of analysed comments in `VideoAnalysis` format."""
+    accumulator = AnalysisAccumulator(bucket, include_comments)
+    accumulator.update(df)
+    return accumulator.summarize(video_id, n_top_words)
+
+
+@router.get("/{video_id}", response_model=VideoAnalysis)
+async def analyse_video(
+    video_id: str,
+    max_comments: int = Query(100, ge=50, le=100_000),
+    order: Literal["time", "relevance"] = "relevance",
+    include_replies: bool = False,
+    bucket: Literal["1h", "1d", "1w", "1mo"] = "1d",
+    n_top_words: int = Query(20, ge=1, le=100),
+    include_comments: int = Query(
+        0,
+        ge=0,
+        le=3000,
+        description="Number of full comment rows to include in response.",
+    ),
+    client: httpx.AsyncClient = Depends(get_youtube_client),
+    model: ResidentModel = Depends(get_model),
+):
+    """
+    Fetches comments (and optionally their replies) of a YouTube video,
+    predicts their sentiment and returns the aggregates, so clients don't have
+    to download the comments and upload them again for prediction.
+
+    Comments are analysed in chunks of `_ANALYSIS_CHUNK_SIZE` (in a worker
+    thread, not to block the event loop) and only their aggregates are kept,
+    so memory doesn't grow with `max_comments`.
+    """
+    accumulator = AnalysisAccumulator(bucket, include_comments)
+    chunk: list[dict] = []
+    async for page in iter_video_comments(
+        client,
+        video_id,
+        max_comments,
+        order,
+        include_replies=include_replies,
+    ):
+        chunk.extend(page)
+        if len(chunk) >= _ANALYSIS_CHUNK_SIZE:
+            df = await asyncio.to_thread(analyse_comments, pl.DataFrame(chunk), model)
+            accumulator.update(df)
+            chunk = []
+    if chunk:
+        df = await asyncio.to_thread(analyse_comments, pl.DataFrame(chunk), model)
+        accumulator.update(df)
+
+    if not accumulator.n_comments:
+        raise HTTPException(400, "No comments found for the given video ID.")
+    return accumulator.summarize(video_id, n_top_words)
+
+
+def _aggregate_comments(df: pl.DataFrame) -> VideoAggregates:
+    accumulator = AnalysisAccumulator(STORE_BUCKET)
+    accumulator.update(df)
+    return accumulator.to_aggregates()
+
+
+async def refresh_stored_comments(
+    client: httpx.AsyncClient,
+    video_id: str,
+    max_comments: int,
+    store: AnalysisStore,
+    model: ResidentModel,
+) -> int:
+    """
+    Fetches latest comments until already stored ones are reached, predicts
+    only the new ones and adds them (and their aggregates) to the store.
+    Returns number of new comments.
+
+    If `max_comments` are fetched without reaching a stored comment (or the
+    oldest comment on first refresh), older comments are missed and the video
+    is flagged with `has_gap`.
+    """
+    new_pages = []
+    n_fetched = 0
+    reached_known = False
+    async for page in iter_video_comments(client, video_id, max_comments, "time"):
+        n_fetched += len(page)
+        ids = [i["id"] for i in page]
+        known = await asyncio.to_thread(store.known_ids, model.uri, video_id, ids)
+        if fresh := [i for i in page if i["id"] not in known]:
+            new_pages.append(pl.DataFrame(fresh))
+        if known:
+            reached_known = True
+            break
+
+    if not new_pages:
+        return 0
+    df = await asyncio.to_thread(analyse_comments, pl.concat(new_pages), model)
+    return await asyncio.to_thread(
+        store.add_comments,
+        model.uri,
+        video_id,
+        df,
+        _aggregate_comments,
+        # stream may have more comments, which are never backfilled
+        has_gap=not reached_known and n_fetched >= max_comments,
+    )
+
+
+@router.post("/{video_id}/refresh", response_model=StoredVideoAnalysis)
+async def refresh_video_analysis(
+    video_id: str,
+    max_comments: int = Query(100, ge=50, le=3000),
+    bucket: Literal["1h", "1d", "1w", "1mo"] = "1d",
+    n_top_words: int = Query(20, ge=1, le=100),
+    include_comments: int = Query(0, ge=0, le=3000),
+    client: httpx.AsyncClient = Depends(get_youtube_client),
+    model: ResidentModel = Depends(get_model),
+    store: AnalysisStore = Depends(get_analysis_store),
+):
+    """
+    Same as `/analyse/{video_id}` but backed by a persistent store of scored
+    comments and their aggregates. Only comments newer than the stored ones
+    are fetched (at most `max_comments`) and predicted, then their aggregates
+    are added to the stored ones.
+
+    `hasGap` is set when any comments are missing, e.g. the first refresh of a
+    video with more than `max_comments` comments.
+    """
+    n_new = await refresh_stored_comments(client, video_id, max_comments, store, model)
+    aggregates = await asyncio.to_thread(store.load_aggregates, model.uri, video_id)
+    if aggregates is None:
+        raise HTTPException(400, "No comments found for the given video ID.")
+
+    comments = await asyncio.to_thread(
+        store.load_comments,
+        model.uri,
+        video_id,
+        include_comments,
+    )
+    accumulator = AnalysisAccumulator(STORE_BUCKET, include_comments)
+    accumulator.restore(aggregates, comments)
+    return {
+        **accumulator.summarize(video_id, n_top_words, bucket),
+        "newComments": n_new,
+        "hasGap": aggregates.has_gap,
+    }
+
+
+class BatchAnalysisInput(BaseModel):
+    video_ids: list[str] = Field(min_length=1, max_length=500)
+    max_comments: int = Field(100, ge=50, le=3000)
+    order: Literal["time", "relevance"] = "relevance"
+    bucket: Literal["1h", "1d", "1w", "1mo"] = "1d"
+    n_top_words: int = Field(20, ge=1, le=100)
+
+
+class BatchVideoAnalysis(BaseModel):
+    video_id: str
+    details: YTVideoDetails | None = None
+    analysis: VideoAnalysis | None = None
+    error: str | None = None
+
+
+# Shared by all batch requests because the API quota is per process, not request
+_youtube_rate_limiter = TokenBucket(
+    rate=float(getenv("YOUTUBE_API_RATE_LIMIT", 10)),
+    capacity=int(getenv("YOUTUBE_API_RATE_BURST", 20)),
+)
+_YOUTUBE_API_CONCURRENCY = int(getenv("YOUTUBE_API_CONCURRENCY", 8))
+
+
+def _ndjson(result: BatchVideoAnalysis) -> str:
+    return result.model_dump_json() + "\n"
+
+
+async def _fetch_comments_df(
+    client: httpx.AsyncClient,
+    video_id: str,
+    body: BatchAnalysisInput,
+) -> pl.DataFrame:
+    pages = [
+        pl.DataFrame(page)
+        async for page in iter_video_comments(
+            client,
+            video_id,
+            body.max_comments,
+            body.order,
+        )
+        if page
+    ]
+    if not pages:
+        raise HTTPException(400, "No comments found for the given video ID.")
+    return pl.concat(pages).with_columns(video_id=pl.lit(video_id))
+
+
+_FetchedComments = tuple[str, pl.DataFrame | None, str | None]
+
+
+async def _fetch_into(
+    fetched: asyncio.Queue[_FetchedComments],
+    client: httpx.AsyncClient,
+    video_id: str,
+    body: BatchAnalysisInput,
+) -> None:
+    """Fetch comments of a video and put exactly one item into `fetched`, even on
+    failure, else the stream would wait for it forever.
+    """
+    try:
+        df = await _fetch_comments_df(client, video_id, body)
+        item = (video_id, df, None)
+    except HTTPException as e:
+        item = (video_id, None, e.detail)
+    except Exception as e:  # noqa: BLE001
+        # e.g. timeouts, connection errors or malformed API responses
+        item = (video_id, None, f"Failed to fetch comments: {e!r}")
+    fetched.put_nowait(item)
+
+
+async def _analyse_fetched(
+    items: list[_FetchedComments],
+    details: dict[str, YTVideoDetails],
+    body: BatchAnalysisInput,
+    model: ResidentModel,
+) -> list[BatchVideoAnalysis]:
+    """Score comments of all fetched videos in one inference batch."""
+    frames = [df for _, df, _ in items if df is not None]
+    scored = {}
+    if frames:
+        df = await asyncio.to_thread(analyse_comments, pl.concat(frames), model)
+        scored = df.partition_by("video_id", as_dict=True, include_key=False)
+
+    results = []
+    for video_id, _, error in items:
+        result = BatchVideoAnalysis(
+            video_id=video_id,
+            details=details[video_id],
+            error=error,
+        )
+        if (video_id,) in scored:
+            result.analysis = VideoAnalysis(
+                **summarize_analysis(
+                    video_id,
+                    scored[(video_id,)],
+                    body.bucket,
+                    body.n_top_words,
+                ),
+            )
+        results.append(result)
+    return results
+
+
+async def stream_batch_analysis(
+    make_client: YouTubeClientFactory,
+    body: BatchAnalysisInput,
+    model: ResidentModel,
+) -> AsyncIterator[str]:
+    """
+    Yields `BatchVideoAnalysis` JSON lines as soon as videos are analysed.
+
+    Comments of at most `YOUTUBE_API_CONCURRENCY` videos are fetched at once,
+    under a shared token bucket rate limit. Videos whose comments are fetched
+    while the model is busy are queued and scored together in one batch.
+    """
+    video_ids = list(dict.fromkeys(body.video_ids))
+    client = make_client(event_hooks={"request": [_youtube_rate_limiter.acquire]})
+    semaphore = asyncio.Semaphore(_YOUTUBE_API_CONCURRENCY)
+    fetched: asyncio.Queue[_FetchedComments] = asyncio.Queue()
+
+    async def fetch(video_id: str) -> None:
+        async with semaphore:
+            await _fetch_into(fetched, client, video_id, body)
+
+    async with client:
+        try:
+            details = await fetch_videos_details(client, video_ids)
+        except (HTTPException, httpx.HTTPError) as e:
+            error = e.detail if isinstance(e, HTTPException) else repr(e)
+            for video_id in video_ids:
+                yield _ndjson(BatchVideoAnalysis(video_id=video_id, error=error))
+            return
+
+        for video_id in video_ids:
+            if video_id not in details:
+                error = "No video found for the given ID."
+                yield _ndjson(BatchVideoAnalysis(video_id=video_id, error=error))
+        tasks = [asyncio.create_task(fetch(i)) for i in video_ids if i in details]
+
+        try:
+            pending = len(tasks)
+            while pending:
+                items = [await fetched.get()]
+                while not fetched.empty():
+                    items.append(fetched.get_nowait())
+                pending -= len(items)
+                for result in await _analyse_fetched(items, details, body, model):
+                    yield _ndjson(result)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+@router.post("/batch")
+async def analyse_videos_batch(
+    body: BatchAnalysisInput,
+    make_client: YouTubeClientFactory = Depends(youtube_client_factory),
+    model: ResidentModel = Depends(get_model),
+):
+    """
+    Analyses many videos at once. Details are fetched in bulk and results are
+    streamed as newline delimited `BatchVideoAnalysis` JSON, one line per video
+    in the order they complete.
+    """
+    return StreamingResponse(
+        stream_batch_analysis(make_client, body, model),
+        media_type="application/x-ndjson",
+    )
+
+
+class SentimentEstimate(BaseModel):
+    proportion: float
+    lower: float
+    upper: float
+
+
+class ApproximateVideoAnalysis(BaseModel):
+    video_id: str
+    # comments and replies, unfetched ones are included if `max_comments` is hit
+    totalComments: NonNegativeInt
+    fetchedComments: NonNegativeInt
+    sampledComments: NonNegativeInt
+    confidence: float
+    marginOfError: float
+    converged: bool
+    sentimentProportion: dict[SentimentType, SentimentEstimate]
+    sentiment_count: SentimentCount
+
+
+# fetched comments are split into strata of this size, in fetch order
+_STRATUM_SIZE = 100
+
+
+async def _sample_strata(
+    strata: list[list[dict]],
+    samples: list[list[int]],
+    size: int,
+    model: ResidentModel,
+) -> None:
+    """
+    Grow the sample of every (shuffled) stratum to `size` per `_STRATUM_SIZE`
+    comments of it, at least 2, and add sentiments of the newly sampled
+    comments to `samples`.
+    """
+    batch = []
+    for h, stratum in enumerate(strata):
+        k = min(len(stratum), max(2, math.ceil(size * len(stratum) / _STRATUM_SIZE)))
+        batch.extend({**i, "stratum": h} for i in stratum[len(samples[h]) : k])
+    if not batch:
+        return
+    df = await asyncio.to_thread(analyse_comments, pl.DataFrame(batch), model)
+    for (h,), sample in df.group_by("stratum", maintain_order=True):
+        samples[h].extend(sample["sentiment"])
+
+
+@router.get("/{video_id}/estimate", response_model=ApproximateVideoAnalysis)
+async def estimate_video_sentiment(
+    video_id: str,
+    error_bound: float = Query(0.03, gt=0, le=0.5),
+    confidence: float = Query(0.95, ge=0.5, le=0.999),
+    max_comments: int = Query(2000, ge=50, le=20_000),
+    order: Literal["time", "relevance"] = "relevance",
+    client: httpx.AsyncClient = Depends(get_youtube_client),
+    model: ResidentModel = Depends(get_model),
+):
+    """
+    Estimates sentiment proportions of all comments (with replies) of a video
+    from a stratified sample.
+
+    At most `max_comments` comments are fetched, which bounds the API calls
+    (about one per 100 comments). Fetched comments are split into strata in
+    fetch order (time order with `order=time`), then samples drawn across all
+    strata are predicted in rounds of doubling size, until the confidence
+    interval of every sentiment is within `error_bound`. So it reduces model
+    predictions, not API calls, compared to `/analyse/{video_id}` with the
+    same `max_comments`.
+
+    Comments left after `max_comments` are never sampled: bounds are widened
+    to cover any sentiment of them, so the estimate may not converge.
+    """
+    details = await fetch_videos_details(client, [video_id])
+    if video_id not in details:
+        raise HTTPException(400, "No video found for the given ID.")
+
+    comments = []
+    async for page in iter_video_comments(
+        client,
+        video_id,
+        max_comments,
+        order,
+        include_replies=True,
+    ):
+        comments.extend(page)
+    if not comments:
+        raise HTTPException(400, "No comments found for the given video ID.")
+
+    # strata are shuffled once, so a sample is a prefix of its stratum
+    strata = [
+        comments[i : i + _STRATUM_SIZE] for i in range(0, len(comments), _STRATUM_SIZE)
+    ]
+    for stratum in strata:
+        random.shuffle(stratum)
+    samples: list[list[int]] = [[] for _ in strata]
+    size = 2
+    while True:
+        await _sample_strata(strata, samples, size, model)
+        estimator = StratifiedEstimator(labels=tuple(SENTIMENT_LABELS.values()))
+        for stratum, sample in zip(strata, samples, strict=True):
+            estimator.add_stratum(len(stratum), sample)
+        if (
+            estimator.sample_size == len(comments)
+            or estimator.margin_of_error(confidence) <= error_bound
+        ):
+            break
+        size *= 2
+
+    if len(comments) >= max_comments:
+        comment_count = int(details[video_id]["commentCount"])
+        estimator.unsampled = max(comment_count - len(comments), 0)
+
+    total = estimator.population + estimator.unsampled
+    estimates = estimator.estimate(confidence)
+    margin_of_error = estimator.margin_of_error(confidence)
+    return {
+        "video_id": video_id,
+        "totalComments": total,
+        "fetchedComments": estimator.population,
+        "sampledComments": estimator.sample_size,
+        "confidence": confidence,
+        "marginOfError": margin_of_error,
+        "converged": margin_of_error <= error_bound,
+        "sentimentProportion": {
+            name: SentimentEstimate(
+                proportion=estimates[label][0],
+                lower=estimates[label][1],
+                upper=estimates[label][2],
+            )
+            for name, label in SENTIMENT_LABELS.items()
+        },
+        "sentiment_count": SentimentCount(
+            **{
+                name: round(estimates[label][0] * total)
+                for name, label in SENTIMENT_LABELS.items()
+            },
+        ),
+    }
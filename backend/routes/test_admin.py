@@ -0,0 +1,46 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from ..app import MLFLOW_MODEL_URI, app
+
+_ADMIN_TOKEN = "test-admin-token"  # noqa: S105
+
+client = TestClient(app, headers={"x-admin-token": _ADMIN_TOKEN})
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", _ADMIN_TOKEN)
+
+
+def test_admin_disabled_without_token_env(monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN")
+    response = client.get("/admin/models")
+    assert response.status_code == 403
+
+
+def test_admin_invalid_token():
+    response = client.get("/admin/models", headers={"x-admin-token": "invalid"})
+    assert response.status_code == 401
+
+
+def test_reload_default_model():
+    response = client.post("/admin/models", json={"uri": MLFLOW_MODEL_URI})
+    assert response.status_code == 200
+    assert response.json()[0]["uri"] == MLFLOW_MODEL_URI
+    assert response.json()[0]["default"] is True
+
+    response = client.post("/predict", json=[{"text": "great video"}])
+    assert response.status_code == 200
+    assert response.headers["x-model-uri"] == MLFLOW_MODEL_URI
+
+
+def test_load_invalid_model():
+    response = client.post("/admin/models", json={"uri": "/does/not/exist"})
+    assert response.status_code == 400
+
+
+def test_predict_with_unknown_model():
+    params = {"model": "models:/unknown/1"}
+    response = client.post("/predict", json=[{"text": "hi"}], params=params)
+    assert response.status_code == 404
@@ -0,0 +1,350 @@
+import json
+from functools import partial
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from ..app import app
+from ..store import AnalysisStore
+from . import analyse
+from .youtube import _BASE_URL, youtube_client_factory
+
+_VIDEO_ID = "dQw4w9WgXcQ"
+_TEXTS = ["This is amazing!", "Worst video ever", "I loved the video.", "ok"]
+
+
+# number of comments the mocked video has and calls made to the mocked API
+_state = {"total": 120, "calls": 0}
+
+
+def _n_replies(n: int) -> int:
+    return (0, 2, 7)[n % 3]
+
+
+def _n_comments() -> int:
+    """Number of comments with replies, like `commentCount` of the video."""
+    return sum(1 + _n_replies(n) for n in range(_state["total"]))
+
+
+def _reply(n: int, j: int) -> dict:
+    return {
+        "id": f"comment{n}.{j}",
+        "snippet": {
+            "authorDisplayName": f"@replier{j}",
+            "authorProfileImageUrl": f"https://yt3.ggpht.com/r{j}.jpg",
+            "textDisplay": _TEXTS[(n + j) % len(_TEXTS)],
+            "likeCount": j,
+            "publishedAt": f"2024-12-{1 + n // 40:02}T11:{j:02}:00Z",
+        },
+    }
+
+
+def _comment_threads(request: httpx.Request) -> httpx.Response:
+    _state["calls"] += 1
+    total = _state["total"]
+    offset = int(request.url.params.get("pageToken", 0))
+    stop = min(offset + int(request.url.params["maxResults"]), total)
+    with_replies = "replies" in request.url.params["part"]
+    # latest comment first, comment number `n` is stable as new ones are added
+    items = [
+        {
+            "id": f"comment{n}",
+            "snippet": {
+                "totalReplyCount": _n_replies(n),
+                "topLevelComment": {
+                    "snippet": {
+                        "authorDisplayName": f"@user{n}",
+                        "authorProfileImageUrl": f"https://yt3.ggpht.com/{n}.jpg",
+                        "textDisplay": _TEXTS[n % len(_TEXTS)],
+                        "likeCount": n,
+                        "publishedAt": f"2024-12-{1 + n // 40:02}T10:{n % 60:02}:00Z",
+                    },
+                },
+            },
+            # like the API, at most 5 replies are embedded in the thread
+            **(
+                {
+                    "replies": {
+                        "comments": [_reply(n, j) for j in range(5)][: _n_replies(n)],
+                    },
+                }
+                if with_replies and _n_replies(n)
+                else {}
+            ),
+        }
+        for n in (total - 1 - i for i in range(offset, stop))
+    ]
+    data = {"items": items}
+    if stop < total:
+        data["nextPageToken"] = str(stop)
+    return httpx.Response(200, json=data)
+
+
+def _comment_replies(request: httpx.Request) -> httpx.Response:
+    _state["calls"] += 1
+    n = int(request.url.params["parentId"].removeprefix("comment"))
+    offset = int(request.url.params.get("pageToken", 0))
+    stop = min(offset + 3, _n_replies(n))  # small pages to test pagination
+    data = {"items": [_reply(n, j) for j in range(offset, stop)]}
+    if stop < _n_replies(n):
+        data["nextPageToken"] = str(stop)
+    return httpx.Response(200, json=data)
+
+
+def _videos(request: httpx.Request) -> httpx.Response:
+    ids = request.url.params["id"].split(",")
+    items = [
+        {
+            "id": i,
+            "snippet": {
+                "title": f"Video {i}",
+                "description": "",
+                "channelTitle": "Channel",
+                "publishedAt": "2024-11-30T10:00:00Z",
+            },
+            "contentDetails": {"duration": "PT5M"},
+            "statistics": {"viewCount": "10", "commentCount": str(_n_comments())},
+        }
+        for i in ids
+        if not i.startswith("missing")
+    ]
+    return httpx.Response(200, json={"items": items})
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    video_id = request.url.params.get("videoId", "")
+    if video_id.startswith("timeout"):
+        raise httpx.ReadTimeout("Timed out.", request=request)
+    if video_id.startswith("broken"):
+        return httpx.Response(500, text="<html>Server Error</html>")
+    if request.url.path.endswith("/videos"):
+        return _videos(request)
+    if request.url.path.endswith("/comments"):
+        return _comment_replies(request)
+    return _comment_threads(request)
+
+
+def _mocked_youtube_client_factory():
+    transport = httpx.MockTransport(_handler)
+    return partial(httpx.AsyncClient, transport=transport, base_url=_BASE_URL)
+
+
+@pytest.fixture(autouse=True)
+def mocked_youtube_api(tmp_path, monkeypatch):
+    _state.update(total=120, calls=0)
+    monkeypatch.setattr(app.state, "store", AnalysisStore(tmp_path / "store.db"))
+    app.dependency_overrides[youtube_client_factory] = _mocked_youtube_client_factory
+    yield
+    app.dependency_overrides.clear()
+
+
+client = TestClient(app, headers={"x-api-key": "test"})
+
+
+def test_analyse_video():
+    params = {"max_comments": 110, "n_top_words": 3}
+    response = client.get(f"/analyse/{_VIDEO_ID}", params=params)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["video_id"] == _VIDEO_ID
+    assert data["totalComments"] == 110
+    assert sum(data["sentiment_count"].values()) == 110
+    assert data["comments"] is None
+    # comments have only 4 distinct texts
+    assert data["dedupRatio"] == pytest.approx(1 - 4 / 110)
+
+    series = data["sentiment_series"]
+    days = [i["start"][:10] for i in series]
+    assert days == ["2024-12-01", "2024-12-02", "2024-12-03"]
+    assert sum(i["positive"] + i["neutral"] + i["negative"] for i in series) == 110
+
+    assert set(data["top_words"]) == {"positive", "neutral", "negative"}
+    for words in data["top_words"].values():
+        assert len(words) <= 3
+        assert all(i["word"] not in {"this", "is", "the"} for i in words)
+
+
+def test_analyse_video_include_replies():
+    params = {"max_comments": 1000, "include_replies": True}
+    response = client.get(f"/analyse/{_VIDEO_ID}", params=params)
+    assert response.status_code == 200
+    # 120 threads, each 3 consecutive ones have 0, 2 and 7 replies
+    assert response.json()["totalComments"] == 120 + 40 * 9
+    # 2 thread pages and 3 reply pages for each thread with 7 replies
+    assert _state["calls"] == 2 + 40 * 3
+
+    params = {"max_comments": 200, "include_replies": True, "include_comments": 200}
+    response = client.get(f"/analyse/{_VIDEO_ID}", params=params)
+    ids = [i["id"] for i in response.json()["comments"]]
+    assert len(ids) == len(set(ids)) == 200
+    # replies follow their thread, partially embedded ones are paged instead
+    assert ids[:11] == [
+        "comment119",
+        *(f"comment119.{j}" for j in range(7)),
+        "comment118",
+        "comment118.0",
+        "comment118.1",
+    ]
+
+
+def test_analyse_video_in_chunks(monkeypatch):
+    params = {"max_comments": 1000, "include_replies": True, "include_comments": 30}
+    expected = client.get(f"/analyse/{_VIDEO_ID}", params=params).json()
+
+    monkeypatch.setattr(analyse, "_ANALYSIS_CHUNK_SIZE", 7)
+    data = client.get(f"/analyse/{_VIDEO_ID}", params=params).json()
+    # texts are deduplicated within a chunk only
+    assert data.pop("dedupRatio") < expected.pop("dedupRatio")
+    assert data == expected
+
+
+def test_analyse_video_include_comments():
+    params = {"max_comments": 50, "include_comments": 20, "bucket": "1h"}
+    response = client.get(f"/analyse/{_VIDEO_ID}", params=params)
+    assert response.status_code == 200
+
+    comments = response.json()["comments"]
+    assert len(comments) == 20
+    assert comments[0]["id"] == "comment119"
+    assert comments[0]["textDisplay"] == _TEXTS[119 % len(_TEXTS)]
+    assert comments[0]["sentiment"] in {-1, 0, 1}
+
+
+def test_refresh_video_analysis_is_incremental():
+    url = f"/analyse/{_VIDEO_ID}/refresh"
+    response = client.post(url, params={"max_comments": 200})
+    assert response.status_code == 200
+    assert response.json()["totalComments"] == 120
+    assert response.json()["newComments"] == 120
+    assert response.json()["hasGap"] is False
+    assert _state["calls"] == 2
+
+    # 20 new comments are posted, only the first page is fetched again
+    _state.update(total=140, calls=0)
+    response = client.post(url, params={"max_comments": 100, "include_comments": 25})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["totalComments"] == 140
+    assert data["newComments"] == 20
+    assert sum(data["sentiment_count"].values()) == 140
+    assert _state["calls"] == 1
+    assert [i["id"] for i in data["comments"][:2]] == ["comment139", "comment138"]
+    assert data["hasGap"] is False
+
+    # nothing new
+    response = client.post(url, params={"max_comments": 100})
+    assert response.json()["newComments"] == 0
+    assert response.json()["totalComments"] == 140
+
+    # stored aggregates (updated with deltas) match analysis of all comments
+    params = {"bucket": "1w", "n_top_words": 5, "include_comments": 3}
+    stored = client.post(url, params={"max_comments": 100, **params}).json()
+    expected = client.get(
+        f"/analyse/{_VIDEO_ID}",
+        params={"max_comments": 140, "order": "time", **params},
+    ).json()
+    for key in ("sentiment_count", "sentiment_series", "top_words", "comments"):
+        assert stored[key] == expected[key]
+
+
+def test_refresh_video_analysis_reports_gap():
+    url = f"/analyse/{_VIDEO_ID}/refresh"
+    client.post(url, params={"max_comments": 200})
+
+    # more than `max_comments` new comments, stored ones are not reached
+    _state.update(total=400)
+    data = client.post(url, params={"max_comments": 100}).json()
+    assert data["newComments"] == 100
+    assert data["totalComments"] == 220
+    assert data["hasGap"] is True
+
+    # gap is remembered by later refreshes
+    _state.update(total=410)
+    data = client.post(url, params={"max_comments": 100}).json()
+    assert data["newComments"] == 10
+    assert data["hasGap"] is True
+
+
+def test_refresh_video_analysis_reports_incomplete_first_load():
+    url = f"/analyse/{_VIDEO_ID}/refresh"
+    data = client.post(url, params={"max_comments": 100}).json()
+    # 20 oldest comments are never fetched
+    assert data["totalComments"] == 100
+    assert data["hasGap"] is True
+
+
+def test_analyse_videos_batch():
+    body = {
+        "video_ids": ["video1", "missing1", "video2", "video1"],
+        "max_comments": 50,
+    }
+    response = client.post("/analyse/batch", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    results = {i["video_id"]: i for i in map(json.loads, response.iter_lines())}
+    assert set(results) == {"video1", "missing1", "video2"}
+    assert results["missing1"]["error"] == "No video found for the given ID."
+    assert results["missing1"]["analysis"] is None
+    for video_id in ("video1", "video2"):
+        assert results[video_id]["error"] is None
+        assert results[video_id]["details"]["title"] == f"Video {video_id}"
+        assert results[video_id]["analysis"]["totalComments"] == 50
+    # one comments page per video, duplicated id is analysed once
+    assert _state["calls"] == 2
+
+
+def test_analyse_videos_batch_fetch_errors():
+    body = {"video_ids": ["timeout1", "video1", "broken1"], "max_comments": 50}
+    response = client.post("/analyse/batch", json=body)
+    assert response.status_code == 200
+
+    # failed videos still get a line, so the stream completes
+    results = {i["video_id"]: i for i in map(json.loads, response.iter_lines())}
+    assert set(results) == {"timeout1", "video1", "broken1"}
+    assert results["video1"]["analysis"]["totalComments"] == 50
+    for video_id in ("timeout1", "broken1"):
+        assert results[video_id]["analysis"] is None
+        assert results[video_id]["error"].startswith("Failed to fetch comments")
+
+
+def test_estimate_video_sentiment():
+    params = {"error_bound": 0.5}
+    response = client.get(f"/analyse/{_VIDEO_ID}/estimate", params=params)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["converged"] is True
+    # comments with replies, all are fetched within `max_comments`
+    assert data["totalComments"] == data["fetchedComments"] == _n_comments() == 480
+    # first round samples 2 comments of each of the 5 strata
+    assert data["sampledComments"] == 10
+    assert data["marginOfError"] <= 0.5
+
+    proportions = data["sentimentProportion"]
+    assert sum(i["proportion"] for i in proportions.values()) == pytest.approx(1)
+    for i in proportions.values():
+        assert i["lower"] <= i["proportion"] <= i["upper"]
+
+
+def test_estimate_video_sentiment_stops_adaptively():
+    params = {"error_bound": 0.1}
+    data = client.get(f"/analyse/{_VIDEO_ID}/estimate", params=params).json()
+    assert data["converged"] is True
+    assert data["marginOfError"] <= 0.1
+    assert 10 < data["sampledComments"] < data["fetchedComments"]
+
+
+def test_estimate_video_sentiment_not_converged():
+    params = {"error_bound": 0.1, "max_comments": 100}
+    response = client.get(f"/analyse/{_VIDEO_ID}/estimate", params=params)
+    data = response.json()
+    assert data["converged"] is False
+    assert data["totalComments"] == 480
+    assert data["fetchedComments"] == 100
+    # unfetched comments can have any sentiment
+    assert data["marginOfError"] > 0.1
+    for i in data["sentimentProportion"].values():
+        assert i["upper"] - i["lower"] >= 380 / 480
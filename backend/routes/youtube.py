@@ -1,4 +1,6 @@
+from collections.abc import AsyncIterator, Callable, Iterable
 from datetime import datetime
+from functools import partial
 from typing import Literal
 
 import httpx
@@ -13,17 +15,32 @@ router = APIRouter(
 )
 
 
-async def get_youtube_client(
+# creates a client, accepts extra `httpx.AsyncClient` keyword arguments
+YouTubeClientFactory = Callable[..., httpx.AsyncClient]
+
+
+def youtube_client_factory(
     x_api_key: str = Header(),
-):
+) -> YouTubeClientFactory:
+    """
+    Returns a function creating YouTube API clients. Streaming endpoints need
+    it because `get_youtube_client` is closed before the response is streamed.
+    """
     params = {
         "key": x_api_key,
     }
-    client = httpx.AsyncClient(
+    return partial(
+        httpx.AsyncClient,
         base_url=_BASE_URL,
         params=params,
         timeout=10,
     )
+
+
+async def get_youtube_client(
+    make_client: YouTubeClientFactory = Depends(youtube_client_factory),
+):
+    client = make_client()
     yield client
     await client.aclose()
 
@@ -54,32 +71,48 @@ async def fetch_youtube_video_details(
     """
     Fetches basic details of a YouTube video using the YouTube Data API v3.
     """
-    params = {
-        "part": "snippet,contentDetails,statistics",
-        "id": video_id,
-    }
+    details = await fetch_videos_details(client, [video_id])
+    if video_id not in details:
+        raise HTTPException(400, "No video found for the given ID.")
+    return details[video_id]
 
-    response = await client.get("/videos", params=params)
-    check_youtube_client_response(response)
 
-    data = response.json()
-    if not ("items" in data and len(data["items"])):
-        raise HTTPException(400, "No video found for the given ID.")
-    video_details = data["items"][0]
-    return {
-        "id": video_id,
-        "title": video_details["snippet"]["title"],
-        "description": video_details["snippet"]["description"],
-        "channelTitle": video_details["snippet"]["channelTitle"],
-        "publishedAt": video_details["snippet"]["publishedAt"],
-        "duration": video_details["contentDetails"]["duration"],
-        "viewCount": video_details["statistics"].get("viewCount", 0),
-        "likeCount": video_details["statistics"].get("likeCount", 0),
-        "commentCount": video_details["statistics"].get("commentCount", 0),
-    }
+async def fetch_videos_details(
+    client: httpx.AsyncClient,
+    video_ids: Iterable[str],
+) -> dict[str, dict]:
+    """
+    Fetches details of many videos, 50 (maximum allowed by the API) per request.
+    Videos which are not found are missing from the returned dict.
+    """
+    video_ids = list(dict.fromkeys(video_ids))
+    details = {}
+    for i in range(0, len(video_ids), 50):
+        params = {
+            "part": "snippet,contentDetails,statistics",
+            "id": ",".join(video_ids[i : i + 50]),
+            "maxResults": 50,
+        }
+        response = await client.get("/videos", params=params)
+        check_youtube_client_response(response)
+
+        for video_details in response.json().get("items", []):
+            details[video_details["id"]] = {
+                "id": video_details["id"],
+                "title": video_details["snippet"]["title"],
+                "description": video_details["snippet"]["description"],
+                "channelTitle": video_details["snippet"]["channelTitle"],
+                "publishedAt": video_details["snippet"]["publishedAt"],
+                "duration": video_details["contentDetails"]["duration"],
+                "viewCount": video_details["statistics"].get("viewCount", 0),
+                "likeCount": video_details["statistics"].get("likeCount", 0),
+                "commentCount": video_details["statistics"].get("commentCount", 0),
+            }
+    return details
 
 
 class CommentDetails(BaseModel):
+    id: str
     authorDisplayName: str
     authorProfileImageUrl: str
     textDisplay: str
@@ -93,28 +126,87 @@ class VideoCommentsResponse(BaseModel):
     comments: list[CommentDetails]
 
 
-@router.get("/video-comments", response_model=VideoCommentsResponse)
-async def fetch_youtube_video_comments(
+def _comment_details(comment_id: str, snippet: dict) -> dict:
+    return {
+        "id": comment_id,
+        "authorDisplayName": snippet["authorDisplayName"],
+        "authorProfileImageUrl": snippet["authorProfileImageUrl"],
+        "textDisplay": snippet["textDisplay"],
+        "likeCount": snippet.get("likeCount", 0),
+        "publishedAt": snippet["publishedAt"],
+    }
+
+
+def _embedded_replies(thread: dict) -> list[dict] | None:
+    """Replies embedded in a comment thread, `None` if they are incomplete."""
+    n_replies = thread["snippet"].get("totalReplyCount", 0)
+    embedded = thread.get("replies", {}).get("comments", [])
+    if len(embedded) < n_replies:
+        return None
+    return [_comment_details(i["id"], i["snippet"]) for i in embedded]
+
+
+async def iter_comment_replies(
+    client: httpx.AsyncClient,
+    parent_id: str,
+    max_replies: int,
+) -> AsyncIterator[list[dict]]:
+    """Yields pages of (at most `max_replies`) replies of a top level comment."""
+    params = {
+        "part": "snippet",
+        "parentId": parent_id,
+        "maxResults": 100,
+        "textFormat": "plainText",
+    }
+
+    n_replies = 0
+    while n_replies < max_replies:
+        response = await client.get("/comments", params=params)
+        check_youtube_client_response(response)
+
+        data = response.json()
+        replies = [
+            _comment_details(i["id"], i["snippet"])
+            for i in data.get("items", [])[: max_replies - n_replies]
+        ]
+        if not replies:
+            break
+        n_replies += len(replies)
+        yield replies
+
+        if not (next_page_token := data.get("nextPageToken")):
+            break
+        params["pageToken"] = next_page_token
+
+
+async def iter_video_comments(
+    client: httpx.AsyncClient,
     video_id: str,
-    max_comments: int = Query(100, ge=50, le=3000),
+    max_comments: int,
     order: Literal["time", "relevance"] = "relevance",
-    client: httpx.AsyncClient = Depends(get_youtube_client),
-):
+    *,
+    include_replies: bool = False,
+) -> AsyncIterator[list[dict]]:
     """
-    Fetches a large number of comments for a YouTube video using the YouTube Data API v3.
+    Yields pages of (at most `max_comments` in total) top level comments of a
+    YouTube video, as `CommentDetails` compatible dicts.
+
+    With `include_replies`, replies of each thread follow their top level
+    comment. The few replies embedded in the thread are used when they are
+    complete, otherwise they are paged from `comments.list` API.
     """
     params = {
-        "part": "snippet",
+        "part": "snippet,replies" if include_replies else "snippet",
         "videoId": video_id,
         "order": order,
         "maxResults": min(100, max_comments),  # Maximum allowed by the API per request
         "textFormat": "plainText",
     }
 
-    comments = []
+    n_comments = 0
     next_page_token = None
 
-    while len(comments) < max_comments:
+    while n_comments < max_comments:
         if next_page_token:
             params["pageToken"] = next_page_token
 
@@ -126,24 +218,55 @@ async def fetch_youtube_video_comments(
         if "items" not in data or not data["items"]:
             break
 
+        comments = []
         for item in data["items"]:
-            snippet = item["snippet"]["topLevelComment"]["snippet"]
-            _o = {
-                "authorDisplayName": snippet["authorDisplayName"],
-                "authorProfileImageUrl": snippet["authorProfileImageUrl"],
-                "textDisplay": snippet["textDisplay"],
-                "likeCount": snippet.get("likeCount", 0),
-                "publishedAt": snippet["publishedAt"],
-            }
-            comments.append(_o)
-
-            if len(comments) >= max_comments:
+            if n_comments + len(comments) >= max_comments:
                 break
+            snippet = item["snippet"]
+            comments.append(
+                _comment_details(item["id"], snippet["topLevelComment"]["snippet"]),
+            )
+
+            embedded = _embedded_replies(item) if include_replies else []
+            if embedded is not None:
+                comments.extend(embedded[: max_comments - n_comments - len(comments)])
+                continue
+
+            # yield what we have, so replies of huge threads are never buffered
+            n_comments += len(comments)
+            yield comments
+            comments = []
+            async for replies in iter_comment_replies(
+                client,
+                item["id"],
+                max_comments - n_comments,
+            ):
+                n_comments += len(replies)
+                yield replies
+
+        if comments:
+            n_comments += len(comments)
+            yield comments
 
         next_page_token = data.get("nextPageToken")
         if not next_page_token:
             break
 
+
+@router.get("/video-comments", response_model=VideoCommentsResponse)
+async def fetch_youtube_video_comments(
+    video_id: str,
+    max_comments: int = Query(100, ge=50, le=3000),
+    order: Literal["time", "relevance"] = "relevance",
+    client: httpx.AsyncClient = Depends(get_youtube_client),
+):
+    """
+    Fetches a large number of comments for a YouTube video using the YouTube Data API v3.
+    """
+    comments = []
+    async for page in iter_video_comments(client, video_id, max_comments, order):
+        comments.extend(page)
+
     if not comments:
         raise HTTPException(400, "No comments found for the given video ID.")
 
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Callable, Iterator
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+import polars as pl
+from fastapi import Request
+
+from .inference import SENTIMENT_LABELS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS comments (
+    model TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    authorDisplayName TEXT NOT NULL,
+    authorProfileImageUrl TEXT NOT NULL,
+    textDisplay TEXT NOT NULL,
+    likeCount INTEGER NOT NULL,
+    publishedAt TEXT NOT NULL,
+    text TEXT NOT NULL,
+    sentiment INTEGER NOT NULL,
+    PRIMARY KEY (model, video_id, id)
+);
+CREATE INDEX IF NOT EXISTS comments_published_at
+    ON comments (model, video_id, publishedAt);
+CREATE TABLE IF NOT EXISTS videos (
+    model TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    n_comments INTEGER NOT NULL,
+    n_model_inputs INTEGER NOT NULL,
+    positive INTEGER NOT NULL,
+    neutral INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    has_gap INTEGER NOT NULL,
+    PRIMARY KEY (model, video_id)
+);
+CREATE TABLE IF NOT EXISTS sentiment_buckets (
+    model TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    start TEXT NOT NULL,
+    positive INTEGER NOT NULL,
+    neutral INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    PRIMARY KEY (model, video_id, start)
+);
+CREATE TABLE IF NOT EXISTS word_counts (
+    model TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    sentiment INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (model, video_id, sentiment, word)
+);
+"""
+
+# Stored sentiment buckets are hourly, coarser ones are merged from them
+STORE_BUCKET = "1h"
+_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+_SENTIMENTS = list(SENTIMENT_LABELS)
+
+_COLUMNS = [
+    "id",
+    "authorDisplayName",
+    "authorProfileImageUrl",
+    "textDisplay",
+    "likeCount",
+    "publishedAt",
+    "text",
+    "sentiment",
+]
+
+
+@dataclass
+class VideoAggregates:
+    """Aggregates of analysed comments of a video (or a delta of them)."""
+
+    n_comments: int
+    n_model_inputs: int
+    sentiment_count: dict[int, int]
+    # `sentiment_buckets` of `STORE_BUCKET` and `word_counts` output
+    buckets: pl.DataFrame
+    words: pl.DataFrame
+    # comments between two refreshes (or before the first one) are missing
+    has_gap: bool = False
+
+
+class AnalysisStore:
+    """SQLite store of scored comments and their aggregates per video.
+
+    Rows are partitioned by model URI, because sentiments predicted by one
+    model are not valid for another one. Aggregates are updated with the delta
+    of new comments, so they are never recomputed from all stored comments.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            if not self._initialized:
+                conn.executescript(_SCHEMA)
+                self._initialized = True
+            yield conn
+
+    def known_ids(self, model: str, video_id: str, ids: list[str]) -> set[str]:
+        """Return subset of comment `ids` which are already stored."""
+        with self._connect() as conn:
+            return self._known_ids(conn, model, video_id, ids)
+
+    def add_comments(
+        self,
+        model: str,
+        video_id: str,
+        df: pl.DataFrame,
+        aggregate: Callable[[pl.DataFrame], VideoAggregates],
+        *,
+        has_gap: bool = False,
+    ) -> int:
+        """
+        Insert analysed comments (output of `analyse_comments`) which are not
+        stored yet and add their `aggregate` to the video aggregates, in one
+        transaction. Returns number of inserted comments.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            known = self._known_ids(conn, model, video_id, df["id"].to_list())
+            df = df.filter(pl.col("id").is_in(known).not_())
+            if df.is_empty():
+                return 0
+            conn.executemany(
+                f"INSERT INTO comments VALUES (?, ?, {','.join('?' * len(_COLUMNS))})",  # noqa: S608
+                (
+                    (model, video_id, *row)
+                    for row in df.select(_COLUMNS)
+                    .with_columns(pl.col("publishedAt").dt.strftime(_DATETIME_FORMAT))
+                    .iter_rows()
+                ),
+            )
+            self._add_aggregates(conn, model, video_id, aggregate(df), has_gap)
+        return df.height
+
+    @staticmethod
+    def _known_ids(
+        conn: sqlite3.Connection,
+        model: str,
+        video_id: str,
+        ids: list[str],
+    ) -> set[str]:
+        if not ids:
+            return set()
+        placeholders = ",".join("?" * len(ids))
+        rows = conn.execute(
+            "SELECT id FROM comments WHERE model = ? AND video_id = ? "  # noqa: S608
+            f"AND id IN ({placeholders})",
+            [model, video_id, *ids],
+        )
+        return {i[0] for i in rows}
+
+    @staticmethod
+    def _add_aggregates(
+        conn: sqlite3.Connection,
+        model: str,
+        video_id: str,
+        delta: VideoAggregates,
+        has_gap: bool,
+    ) -> None:
+        counts = [delta.sentiment_count[i] for i in SENTIMENT_LABELS.values()]
+        conn.execute(
+            "INSERT INTO videos VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (model, video_id) DO UPDATE SET "
+            "n_comments = n_comments + excluded.n_comments, "
+            "n_model_inputs = n_model_inputs + excluded.n_model_inputs, "
+            "positive = positive + excluded.positive, "
+            "neutral = neutral + excluded.neutral, "
+            "negative = negative + excluded.negative, "
+            "has_gap = has_gap OR excluded.has_gap",
+            [model, video_id, delta.n_comments, delta.n_model_inputs, *counts, has_gap],
+        )
+        conn.executemany(
+            "INSERT INTO sentiment_buckets VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (model, video_id, start) DO UPDATE SET "
+            "positive = positive + excluded.positive, "
+            "neutral = neutral + excluded.neutral, "
+            "negative = negative + excluded.negative",
+            (
+                (model, video_id, *row)
+                for row in delta.buckets.select(
+                    pl.col("start").dt.strftime(_DATETIME_FORMAT),
+                    *_SENTIMENTS,
+                ).iter_rows()
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO word_counts VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (model, video_id, sentiment, word) DO UPDATE SET "
+            "count = count + excluded.count",
+            (
+                (model, video_id, *row)
+                for row in delta.words.select("sentiment", "word", "count").iter_rows()
+            ),
+        )
+
+    def load_aggregates(self, model: str, video_id: str) -> VideoAggregates | None:
+        """Stored aggregates of a video, `None` if nothing is stored."""
+        with self._connect() as conn:
+            video = conn.execute(
+                "SELECT n_comments, n_model_inputs, positive, neutral, negative, "
+                "has_gap FROM videos WHERE model = ? AND video_id = ?",
+                [model, video_id],
+            ).fetchone()
+            if video is None:
+                return None
+            buckets = conn.execute(
+                f"SELECT start, {','.join(_SENTIMENTS)} FROM sentiment_buckets "  # noqa: S608
+                "WHERE model = ? AND video_id = ?",
+                [model, video_id],
+            ).fetchall()
+            words = conn.execute(
+                "SELECT sentiment, word, count FROM word_counts "
+                "WHERE model = ? AND video_id = ?",
+                [model, video_id],
+            ).fetchall()
+
+        n_comments, n_model_inputs, *counts, has_gap = video
+        return VideoAggregates(
+            n_comments=n_comments,
+            n_model_inputs=n_model_inputs,
+            sentiment_count=dict(zip(SENTIMENT_LABELS.values(), counts, strict=True)),
+            buckets=pl.DataFrame(
+                buckets,
+                schema={"start": pl.String} | dict.fromkeys(_SENTIMENTS, pl.Int64),
+                orient="row",
+            ).with_columns(pl.col("start").str.to_datetime(time_zone="UTC")),
+            words=pl.DataFrame(
+                words,
+                schema={"sentiment": pl.Int8, "word": pl.String, "count": pl.Int64},
+                orient="row",
+            ),
+            has_gap=bool(has_gap),
+        )
+
+    def load_comments(
+        self,
+        model: str,
+        video_id: str,
+        limit: int | None = None,
+    ) -> pl.DataFrame:
+        """Load stored comments of a video, latest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {','.join(_COLUMNS)} FROM comments "  # noqa: S608
+                "WHERE model = ? AND video_id = ? ORDER BY publishedAt DESC "
+                "LIMIT ?",
+                [model, video_id, -1 if limit is None else limit],
+            ).fetchall()
+        return pl.DataFrame(
+            rows,
+            schema={
+                "id": pl.String,
+                "authorDisplayName": pl.String,
+                "authorProfileImageUrl": pl.String,
+                "textDisplay": pl.String,
+                "likeCount": pl.Int64,
+                "publishedAt": pl.String,
+                "text": pl.String,
+                "sentiment": pl.Int8,
+            },
+            orient="row",
+        ).with_columns(pl.col("publishedAt").str.to_datetime(time_zone="UTC"))
+
+
+def get_analysis_store(request: Request) -> AnalysisStore:
+    return request.app.state.store
@@ -53,6 +53,46 @@ def test_predict_valid_comments(test_comments):
     assert "comments" in json_data
     assert "sentiment_count" in json_data
     assert len(json_data["comments"]) == len(test_comments)
+    for comment in json_data["comments"]:
+        assert 0 <= comment["confidence"] <= 1
+
+
+def test_predict_duplicate_and_empty_comments():
+    texts = ["first", "First", "😂😂", "great video", "first", "❤️"]
+    response = client.post("/predict", json=[{"text": i} for i in texts])
+    assert response.status_code == 200
+    # only "first" and "great video" are passed to the model
+    dedup_ratio = float(response.headers["X-Dedup-Ratio"])
+    assert dedup_ratio == pytest.approx(1 - 2 / 6, abs=1e-4)
+
+    comments = response.json()["comments"]
+    assert [i["text"] for i in comments] == texts
+    assert len({(i["sentiment"], i["confidence"]) for i in comments[:2]}) == 1
+    for i in (2, 5):
+        assert comments[i]["sentiment"] == 0
+        assert comments[i]["confidence"] is None
+
+
+def test_predict_duplicates_differing_in_whitespace():
+    texts = ["😂 😂", "❤️ ❤️ ❤️", "FIRST 🔥", "first", " first", "🔥 first"]
+    response = client.post("/predict", json=[{"text": i} for i in texts])
+    assert response.status_code == 200
+    # every text is "first" or empty after preprocessing
+    dedup_ratio = float(response.headers["X-Dedup-Ratio"])
+    assert dedup_ratio == pytest.approx(1 - 1 / 6, abs=1e-4)
+
+    comments = response.json()["comments"]
+    assert [i["text"] for i in comments] == texts
+    assert len({(i["sentiment"], i["confidence"]) for i in comments[2:]}) == 1
+    for i in (0, 1):
+        assert comments[i]["sentiment"] == 0
+        assert comments[i]["confidence"] is None
+
+
+def test_predict_keeps_order_of_comments(test_comments):
+    expected = client.post("/predict", json=test_comments).json()["comments"]
+    response = client.post("/predict", json=test_comments[::-1])
+    assert response.json()["comments"] == expected[::-1]
 
 
 def test_sentiment_count_plot():
@@ -0,0 +1,67 @@
+"""Tests for stratified sentiment estimation"""
+
+import random
+
+import pytest
+
+from .estimation import StratifiedEstimator
+
+_LABELS = (1, 0, -1)
+
+
+def test_census_has_no_error():
+    estimator = StratifiedEstimator(labels=_LABELS)
+    estimator.add_stratum(4, [1, 1, 0, -1])
+    estimator.add_stratum(2, [1, 1])
+    estimates = estimator.estimate(0.95)
+    assert estimates[1] == pytest.approx((4 / 6, 4 / 6, 4 / 6))
+    assert estimates[-1][0] == pytest.approx(1 / 6)
+    assert estimator.margin_of_error(0.95) == pytest.approx(0)
+
+
+def test_estimate_covers_true_proportion():
+    rng = random.Random(0)  # noqa: S311 (seeded test data)
+    population = rng.choices(_LABELS, weights=[0.5, 0.3, 0.2], k=20_000)
+    true_p = {i: population.count(i) / len(population) for i in _LABELS}
+
+    estimator = StratifiedEstimator(labels=_LABELS)
+    margins = []
+    for i in range(0, len(population), 100):
+        estimator.add_stratum(100, rng.sample(population[i : i + 100], 20))
+        if estimator.sample_size > 20:
+            margins.append(estimator.margin_of_error(0.95))
+
+    assert estimator.sample_size == 4000
+    assert margins[-1] < margins[0]
+    assert margins[-1] < 0.02
+    for label, (p, lower, upper) in estimator.estimate(0.95).items():
+        assert lower <= true_p[label] <= upper
+        assert p == pytest.approx(true_p[label], abs=0.02)
+
+
+def test_invalid_stratum():
+    estimator = StratifiedEstimator(labels=_LABELS)
+    with pytest.raises(ValueError, match="sample size"):
+        estimator.add_stratum(1, [1, 0])
+    with pytest.raises(ValueError, match="no strata"):
+        estimator.estimate(0.95)
+
+
+def test_uniform_sample_has_error():
+    estimator = StratifiedEstimator(labels=_LABELS)
+    estimator.add_stratum(100, [1] * 10)
+    estimator.add_stratum(100, [1] * 10)
+    p, lower, upper = estimator.estimate(0.95)[1]
+    assert p == 1
+    assert lower < 1
+    assert estimator.margin_of_error(0.95) > 0
+
+
+def test_unsampled_widens_bounds():
+    estimator = StratifiedEstimator(labels=_LABELS)
+    estimator.add_stratum(4, [1, 1, 0, -1])
+    estimator.unsampled = 4
+    estimates = estimator.estimate(0.95)
+    assert estimates[1] == pytest.approx((0.5, 0.25, 0.75))
+    assert estimates[0] == pytest.approx((0.25, 0.125, 0.625))
+    assert estimator.margin_of_error(0.95) == pytest.approx(0.375)
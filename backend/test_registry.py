@@ -0,0 +1,66 @@
+"""Tests for in-memory model registry"""
+
+import asyncio
+
+import pytest
+
+from .registry import ModelRegistry, get_model
+
+
+class FakePipeline:
+    def __init__(self, uri: str):
+        self.uri = uri
+
+    def predict(self, x):
+        return [0] * len(x)
+
+
+def make_registry(**kwargs) -> ModelRegistry:
+    return ModelRegistry("models:/default/1", loader=FakePipeline, **kwargs)
+
+
+def test_default_model_is_loaded_lazily():
+    registry = make_registry()
+    assert registry.status() == []
+    assert registry.get().pipeline.uri == "models:/default/1"
+    with pytest.raises(KeyError):
+        registry.get("models:/unknown/1")
+
+
+def test_load_swaps_default_model():
+    registry = make_registry()
+    old = registry.get()
+    asyncio.run(registry.load("models:/default/2", make_default=True))
+    assert registry.get().uri == "models:/default/2"
+    # previous default is still resident, so it can be picked explicitly
+    assert registry.get(old.uri) is old
+
+
+def test_least_recently_used_model_is_evicted():
+    registry = make_registry(max_models=2)
+    registry.get()
+    asyncio.run(registry.load("models:/a/1"))
+    asyncio.run(registry.load("models:/b/1"))
+    assert [i["uri"] for i in registry.status()] == ["models:/default/1", "models:/b/1"]
+
+
+def test_idle_model_is_evicted():
+    registry = make_registry(idle_ttl=0)
+    registry.get()
+    asyncio.run(registry.load("models:/a/1"))
+    registry.evict()
+    assert [i["uri"] for i in registry.status()] == ["models:/default/1"]
+    with pytest.raises(ValueError, match="default model"):
+        registry.unload("models:/default/1")
+
+
+def test_get_model_runs_on_event_loop():
+    registry = make_registry(idle_ttl=0)
+
+    async def run():
+        await registry.load("models:/a/1")
+        return await asyncio.gather(*(get_model(None, registry) for _ in range(20)))
+
+    models = asyncio.run(run())
+    assert {i.uri for i in models} == {"models:/default/1"}
+    assert [i["uri"] for i in registry.status()] == ["models:/default/1"]
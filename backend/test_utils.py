@@ -0,0 +1,26 @@
+"""Tests for backend utilities"""
+
+import asyncio
+import time
+
+import pytest
+
+from .utils import TokenBucket
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=5)
+
+    async def acquire_all(n: int) -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(bucket.acquire() for _ in range(n)))
+        return time.perf_counter() - start
+
+    # burst of `capacity` calls is not delayed, next 10 calls wait for 10 tokens
+    assert asyncio.run(acquire_all(5)) < 0.05
+    assert asyncio.run(acquire_all(10)) == pytest.approx(0.2, abs=0.08)
+
+
+def test_token_bucket_invalid_args():
+    with pytest.raises(ValueError, match="rate must be positive"):
+        TokenBucket(rate=0, capacity=1)
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import os
-from functools import cache
+import time
 from typing import TYPE_CHECKING, Any
 
 import mlflow.sklearn
@@ -17,9 +18,39 @@ def getenv(name: str, default: Any = None) -> str:
     return env
 
 
-@cache
 def load_model(model_uri: str) -> Pipeline:
     model = mlflow.sklearn.load_model(model_uri)
     if model is None:
         raise FileNotFoundError("error while importing model from its URI")
     return model
+
+
+class TokenBucket:
+    """Async token bucket rate limiter allowing `rate` calls per second with
+    bursts of at most `capacity` calls.
+
+    It does not hold any asyncio primitive, so one instance can be shared by
+    all requests of a process.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be positive and capacity at least 1.")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    async def acquire(self, *_args: Any) -> None:
+        # extra args let it be used as a httpx request event hook
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated) * self.rate,
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
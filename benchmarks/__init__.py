@@ -0,0 +1 @@
+"""Offline benchmark suite for the backend endpoints and the ML pipeline stages."""
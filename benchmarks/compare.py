@@ -0,0 +1,73 @@
+"""Compare two benchmark result files and report regressions.
+
+Usage:
+    python -m benchmarks.compare BASELINE.json CANDIDATE.json [--threshold 0.1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+# Only these metrics are compared, lower is better for all of them
+_METRICS = ("p50_ms", "p95_ms")
+
+
+def _flatten(data: dict[str, Any], prefix: str = "") -> Iterator[tuple[str, float]]:
+    for key, value in data.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        elif key in _METRICS:
+            yield f"{prefix}{key}", value
+
+
+def compare(
+    baseline: dict[str, Any],
+    candidate: dict[str, Any],
+    threshold: float,
+) -> list[tuple[str, float, float, float, bool]]:
+    """Return ``(metric, baseline, candidate, change, is_regression)`` rows."""
+    old = dict(_flatten(baseline["results"]))
+    rows = []
+    for metric, new_value in _flatten(candidate["results"]):
+        if metric not in old or not old[metric]:
+            continue
+        change = (new_value - old[metric]) / old[metric]
+        rows.append((metric, old[metric], new_value, change, change > threshold))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown reported as regression (default: 0.1)",
+    )
+    args = parser.parse_args()
+
+    with args.baseline.open() as f:
+        baseline = json.load(f)
+    with args.candidate.open() as f:
+        candidate = json.load(f)
+
+    print(f"baseline={baseline['commit']} candidate={candidate['commit']}")
+    rows = compare(baseline, candidate, args.threshold)
+    width = max((len(i[0]) for i in rows), default=0)
+    for metric, old, new, change, regression in rows:
+        flag = "  REGRESSION" if regression else ""
+        print(f"{metric:<{width}}  {old:>10.3f}  {new:>10.3f}  {change:>+8.1%}{flag}")
+
+    if any(i[4] for i in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Synthetic data, locally trained model and a mocked YouTube Data API.
+
+Everything here is deterministic so that two benchmark runs on different
+commits measure the same workload.
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import httpx
+import polars as pl
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+SEED = 42
+VIDEO_ID = "bench000001"
+
+_WORDS = {
+    -1: ["bad", "boring", "hate", "worst", "terrible", "awful", "waste", "annoying"],
+    0: ["video", "today", "watch", "channel", "part", "episode", "music", "topic"],
+    1: ["great", "amazing", "love", "awesome", "fantastic", "best", "helpful", "nice"],
+}
+_FILLERS = ["this", "is", "the", "a", "really", "so", "and", "of", "it", "you"]
+_PUBLISHED_AT = datetime(2024, 12, 1, tzinfo=UTC)
+
+
+def make_comments(n: int, *, seed: int = SEED) -> tuple[list[str], list[int]]:
+    """Generate ``n`` comments with their sentiment labels (-1, 0, 1)."""
+    rng = random.Random(seed)  # noqa: S311 (seeded for reproducible workloads)
+    texts, labels = [], []
+    for _ in range(n):
+        label = rng.choice((-1, 0, 1))
+        words = rng.choices(_WORDS[label], k=rng.randint(1, 4))
+        words += rng.choices(_FILLERS, k=rng.randint(2, 12))
+        rng.shuffle(words)
+        text = " ".join(words)
+        # Add some noise which preprocessing has to clean up
+        if rng.random() < 0.3:
+            text = text.title() + rng.choice([" !!", " 😂", "\n", " ❤️❤️"])
+        texts.append(text)
+        labels.append(label)
+    return texts, labels
+
+
+_SPAM = [
+    "first",
+    "First!!",
+    "FIRST 🔥",
+    "😂😂😂",
+    "❤️",
+    "🔥🔥🔥🔥",
+    "👍",
+    "who is watching in 2024?",
+    "Check out my channel for more videos like this!!",
+    "I made $5000 last week working from home, click my profile",
+]
+
+
+def make_spammy_comments(
+    n: int,
+    spam_fraction: float,
+    *,
+    seed: int = SEED,
+) -> list[str]:
+    """``make_comments`` where ``spam_fraction`` of comments are replaced with
+    repeated spam, i.e. "first", emoji only and copy-paste comments.
+    """
+    rng = random.Random(seed)  # noqa: S311 (seeded for reproducible workloads)
+    texts, _ = make_comments(n, seed=seed)
+    return [rng.choice(_SPAM) if rng.random() < spam_fraction else i for i in texts]
+
+
+def write_raw_dataset(path: Path, n: int) -> Path:
+    """Write a CSV shaped like ``params.dataset.url`` (``clean_comment``, ``category``)."""
+    texts, labels = make_comments(n)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pl.DataFrame({"clean_comment": texts, "category": labels}).write_csv(path)
+    return path
+
+
+def train_model(n: int = 2000) -> Pipeline:
+    """Fit the configured pipeline on ``n`` synthetic comments."""
+    from ml.comment_sentiment.building import build_pipeline
+
+    texts, labels = make_comments(n)
+    pipeline = build_pipeline()
+    pipeline.fit(pl.Series(texts), pl.Series(labels))
+    return pipeline
+
+
+def save_model(pipeline: Pipeline, path: Path) -> str:
+    """Save pipeline in MLflow format and return the URI ``load_model`` expects."""
+    import mlflow.sklearn
+
+    mlflow.sklearn.save_model(pipeline, path.as_posix())
+    return path.as_posix()
+
+
+def _comment_snippet(video_id: str, index: int, text: str) -> dict:
+    return {
+        "videoId": video_id,
+        "authorDisplayName": f"@user{index}",
+        "authorProfileImageUrl": f"https://yt3.ggpht.com/user{index}.jpg",
+        "textDisplay": text,
+        "textOriginal": text,
+        "likeCount": index % 17,
+        "publishedAt": (_PUBLISHED_AT - timedelta(minutes=index)).strftime(
+            "%Y-%m-%dT%H:%M:%SZ",
+        ),
+    }
+
+
+# nested handlers of each API resource share the mock's state
+def make_youtube_transport(  # noqa: C901
+    total_comments: int = 3000,
+    *,
+    replies_per_thread: int = 0,
+    latency: float = 0.0,
+    stats: dict[str, int] | None = None,
+) -> httpx.MockTransport:
+    """Mocked YouTube Data API v3 serving ``/videos``, ``/commentThreads`` and
+    ``/comments`` (replies).
+
+    ``total_comments`` is the number of comment threads, each having
+    ``replies_per_thread`` replies. Like the real API, at most 5 replies are
+    embedded in a thread. Pages are generated on demand from the page token (an
+    offset), so the mock itself never holds all comments in memory.
+    ``latency`` (seconds) simulates the network round trip of each call and
+    ``stats["calls"]`` counts them.
+    """
+    import asyncio
+
+    texts, _ = make_comments(min(total_comments, 5000))
+    stats = stats if stats is not None else {}
+    stats.setdefault("calls", 0)
+
+    def video_item(video_id: str) -> dict:
+        return {
+            "id": video_id,
+            "snippet": {
+                "title": f"Benchmark video {video_id}",
+                "description": "A video used for benchmarking.",
+                "channelTitle": "Benchmarks",
+                "publishedAt": _PUBLISHED_AT.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            },
+            "contentDetails": {"duration": "PT10M"},
+            "statistics": {
+                "viewCount": "100000",
+                "likeCount": "5000",
+                "commentCount": str(total_comments * (1 + replies_per_thread)),
+            },
+        }
+
+    def reply(video_id: str, i: int, j: int) -> dict:
+        return {
+            "id": f"{video_id}.{i}.{j}",
+            "snippet": _comment_snippet(video_id, i, texts[(i + j) % len(texts)]),
+        }
+
+    def comment_threads(params: httpx.QueryParams) -> dict:
+        video_id = params["videoId"]
+        offset = int(params.get("pageToken", 0))
+        limit = min(int(params.get("maxResults", 20)), 100)
+        stop = min(offset + limit, total_comments)
+        with_replies = "replies" in params["part"] and replies_per_thread
+        items = []
+        for i in range(offset, stop):
+            item = {
+                "id": f"{video_id}.{i}",
+                "snippet": {
+                    "videoId": video_id,
+                    "totalReplyCount": replies_per_thread,
+                    "topLevelComment": {
+                        "id": f"{video_id}.{i}",
+                        "snippet": _comment_snippet(video_id, i, texts[i % len(texts)]),
+                    },
+                },
+            }
+            if with_replies:
+                n = min(replies_per_thread, 5)
+                item["replies"] = {
+                    "comments": [reply(video_id, i, j) for j in range(n)],
+                }
+            items.append(item)
+        data: dict = {"items": items}
+        if stop < total_comments:
+            data["nextPageToken"] = str(stop)
+        return data
+
+    def comment_replies(params: httpx.QueryParams) -> dict:
+        video_id, i = params["parentId"].rsplit(".", 1)
+        offset = int(params.get("pageToken", 0))
+        limit = min(int(params.get("maxResults", 20)), 100)
+        stop = min(offset + limit, replies_per_thread)
+        items = [reply(video_id, int(i), j) for j in range(offset, stop)]
+        data: dict = {"items": items}
+        if stop < replies_per_thread:
+            data["nextPageToken"] = str(stop)
+        return data
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        stats["calls"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        params = request.url.params
+        match request.url.path.removeprefix("/youtube/v3"):
+            case "/videos":
+                ids = params["id"].split(",")
+                return httpx.Response(200, json={"items": [video_item(i) for i in ids]})
+            case "/commentThreads":
+                return httpx.Response(200, json=comment_threads(params))
+            case "/comments":
+                return httpx.Response(200, json=comment_replies(params))
+        return httpx.Response(404, json={"error": {"message": "Not found."}})
+
+    return httpx.MockTransport(handler)
@@ -0,0 +1,535 @@
+"""Run the benchmark suite and dump results as JSON.
+
+Everything runs offline: a small model is trained on synthetic comments and the
+YouTube Data API is replaced with a mocked transport.
+
+Usage:
+    python -m benchmarks.run [--quick] [--only NAME ...] [--output PATH]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import yaml
+from loguru import logger
+
+from benchmarks import fixtures
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+BenchmarkFn = Callable[["Context"], dict[str, Any]]
+BENCHMARKS: dict[str, BenchmarkFn] = {}
+
+
+def benchmark(name: str) -> Callable[[BenchmarkFn], BenchmarkFn]:
+    """Register a benchmark function under ``name``."""
+
+    def decorator(fn: BenchmarkFn) -> BenchmarkFn:
+        BENCHMARKS[name] = fn
+        return fn
+
+    return decorator
+
+
+@dataclass
+class Context:
+    workdir: Path
+    quick: bool = False
+    extras: dict[str, Any] = field(default_factory=dict)
+
+    def size(self, full: int, quick: int) -> int:
+        return quick if self.quick else full
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Summarize timings (seconds) into milliseconds statistics."""
+    ms = sorted(i * 1000 for i in samples)
+    quantiles = statistics.quantiles(ms, n=100) if len(ms) > 1 else ms * 99
+    return {
+        "n": len(ms),
+        "min_ms": round(ms[0], 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(quantiles[49], 3),
+        "p95_ms": round(quantiles[94], 3),
+        "p99_ms": round(quantiles[98], 3),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> dict[str, float]:
+    """Call ``fn`` ``repeat`` times after ``warmup`` calls and summarize timings."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def load_test(
+    client,
+    method: str,
+    url: str,
+    *,
+    requests: int,
+    concurrency: int,
+    **kwargs,
+) -> dict[str, Any]:
+    """Fire ``requests`` calls with at most ``concurrency`` of them in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one() -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    total = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "total_s": round(total, 3),
+        "rps": round(requests / total, 2),
+        "errors": errors,
+        **summarize(latencies),
+    }
+
+
+# ------------------------------------------------------------------------------
+# ML pipeline benchmarks
+# ------------------------------------------------------------------------------
+
+
+@benchmark("preprocess_comments")
+def bench_preprocess_comments(ctx: Context) -> dict[str, Any]:
+    import polars as pl
+
+    from ml.comment_sentiment.ingestion import preprocess_comments
+
+    results = {}
+    for n in (1_000, 10_000, ctx.size(100_000, 20_000)):
+        df = pl.DataFrame({"text": fixtures.make_comments(n)[0]})
+        results[f"rows_{n}"] = measure(
+            lambda df=df: df.select(pl.col("text").pipe(preprocess_comments)),
+            repeat=ctx.size(20, 5),
+        )
+    return results
+
+
+@benchmark("build_pipeline_fit")
+def bench_build_pipeline_fit(ctx: Context) -> dict[str, Any]:
+    import polars as pl
+
+    from ml.comment_sentiment.building import build_pipeline
+
+    n = ctx.size(5_000, 1_000)
+    texts, labels = fixtures.make_comments(n)
+    x, y = pl.Series(texts), pl.Series(labels)
+    return {
+        f"rows_{n}": measure(
+            lambda: build_pipeline().fit(x, y),
+            repeat=ctx.size(3, 1),
+            warmup=0,
+        ),
+    }
+
+
+@benchmark("pipeline_predict")
+def bench_pipeline_predict(ctx: Context) -> dict[str, Any]:
+    import polars as pl
+
+    pipeline = ctx.extras["pipeline"]
+    texts, _ = fixtures.make_comments(3000, seed=7)
+    results = {}
+    for batch_size in (1, 10, 100, 1000, 3000):
+        batch = pl.Series(texts[:batch_size])
+        stats = measure(lambda batch=batch: pipeline.predict(batch), ctx.size(20, 5))
+        stats["rows_per_s"] = round(batch_size / (stats["p50_ms"] / 1000), 1)
+        results[f"batch_{batch_size}"] = stats
+    return results
+
+
+@benchmark("cascade_predict")
+def bench_cascade_predict(ctx: Context) -> dict[str, Any]:
+    """``pipeline_predict`` of a cascade in front of the benchmark model at a few
+    thresholds, with the fraction of rows handled by the fast model.
+    """
+    import polars as pl
+    from sklearn.base import clone
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    from ml.comment_sentiment.cascade import CascadeClassifier
+
+    pipeline = ctx.extras["pipeline"]
+    texts, labels = fixtures.make_comments(2000)
+    cascade = Pipeline(
+        steps=[
+            ("vectorizer", clone(pipeline["vectorizer"])),
+            (
+                "model",
+                CascadeClassifier(
+                    LogisticRegression(max_iter=1000),
+                    clone(pipeline["model"]),
+                ),
+            ),
+        ],
+    ).fit(pl.Series(texts), pl.Series(labels))
+
+    batch = pl.Series(fixtures.make_comments(3000, seed=7)[0])
+    proba = cascade[-1].fast_.predict_proba(cascade[:-1].transform(batch))
+    confidence = proba.max(axis=1)
+    results = {}
+    for threshold in (0.0, 0.5, 0.8, 0.95, 1.0):
+        cascade.set_params(model__threshold=threshold)
+        stats = measure(lambda: cascade.predict(batch), ctx.size(20, 5))
+        stats["rows_per_s"] = round(batch.len() / (stats["p50_ms"] / 1000), 1)
+        stats["fast_fraction"] = round(float((confidence > threshold).mean()), 3)
+        results[f"threshold_{threshold}"] = stats
+    return results
+
+
+@benchmark("predict_spammy_comments")
+def bench_predict_spammy_comments(ctx: Context) -> dict[str, Any]:
+    """``predict_sentiment`` (which scores each distinct preprocessed text once)
+    against ``pipeline.predict`` of every row, as the share of spam grows.
+    """
+    import polars as pl
+
+    from backend.inference import dedup_ratio, predict_sentiment
+    from ml.comment_sentiment.ingestion import preprocess_comments
+
+    pipeline = ctx.extras["pipeline"]
+    n = ctx.size(10_000, 3000)
+    results = {}
+    for spam_fraction in (0.0, 0.3, 0.6):
+        df = pl.DataFrame(
+            {"text": fixtures.make_spammy_comments(n, spam_fraction, seed=7)},
+        ).select(pl.col("text").pipe(preprocess_comments))
+        dedup = measure(
+            lambda df=df: df.select(
+                predict_sentiment(pipeline, pl.col("text"), preprocessed=True),
+            ),
+            ctx.size(10, 3),
+        )
+        every_row = measure(
+            lambda df=df: pipeline.predict(df["text"]),
+            ctx.size(10, 3),
+        )
+        results[f"spam_{spam_fraction}"] = {
+            "dedup_ratio": round(dedup_ratio(df["text"]), 3),
+            "dedup": dedup,
+            "every_row": every_row,
+            "speedup": round(every_row["p50_ms"] / dedup["p50_ms"], 2),
+        }
+    return results
+
+
+@benchmark("ingestion")
+def bench_ingestion(ctx: Context) -> dict[str, Any]:
+    from ml.comment_sentiment import ingestion
+
+    return {
+        f"rows_{ctx.extras['raw_rows']}": measure(
+            ingestion.main,
+            repeat=ctx.size(5, 2),
+        ),
+    }
+
+
+# ------------------------------------------------------------------------------
+# HTTP endpoint benchmarks
+# ------------------------------------------------------------------------------
+
+
+def _endpoint_cases(ctx: Context) -> dict[str, tuple[str, str, dict]]:
+    texts, _ = fixtures.make_comments(ctx.size(500, 100), seed=11)
+    return {
+        "GET /": ("GET", "/", {}),
+        "GET /validate-yt-url": (
+            "GET",
+            "/validate-yt-url",
+            {"params": {"url": f"https://www.youtube.com/watch?v={fixtures.VIDEO_ID}"}},
+        ),
+        "POST /predict": ("POST", "/predict", {"json": [{"text": i} for i in texts]}),
+        "POST /sentiment-count-plot": (
+            "POST",
+            "/sentiment-count-plot",
+            {"json": {"positive": 10, "neutral": 5, "negative": 3}},
+        ),
+        "POST /comments-wordcloud": ("POST", "/comments-wordcloud", {"json": texts}),
+        "GET /youtube/video-details": (
+            "GET",
+            "/youtube/video-details",
+            {"params": {"video_id": fixtures.VIDEO_ID}},
+        ),
+        "GET /youtube/video-comments": (
+            "GET",
+            "/youtube/video-comments",
+            {"params": {"video_id": fixtures.VIDEO_ID, "max_comments": 1000}},
+        ),
+        "GET /analyse/{video_id}": (
+            "GET",
+            f"/analyse/{fixtures.VIDEO_ID}",
+            {"params": {"max_comments": 1000}},
+        ),
+        "GET /analyse/{video_id}/estimate": (
+            "GET",
+            f"/analyse/{fixtures.VIDEO_ID}/estimate",
+            {"params": {"max_comments": 1000}},
+        ),
+        # after the warmup call only the first page is fetched, nothing is new
+        "POST /analyse/{video_id}/refresh": (
+            "POST",
+            f"/analyse/{fixtures.VIDEO_ID}/refresh",
+            {"params": {"max_comments": 1000}},
+        ),
+        "POST /analyse/batch": (
+            "POST",
+            "/analyse/batch",
+            {
+                "json": {
+                    "video_ids": [f"bench{i:06}" for i in range(10)],
+                    "max_comments": 300,
+                },
+            },
+        ),
+    }
+
+
+@asynccontextmanager
+async def app_client(transport) -> AsyncIterator[Any]:
+    """Client of backend app (with lifespan) using mocked YouTube ``transport``."""
+    import httpx
+
+    from backend.app import app, lifespan
+    from backend.routes import youtube
+
+    def mocked_youtube_client_factory():
+        return partial(
+            httpx.AsyncClient,
+            transport=transport,
+            base_url=youtube._BASE_URL,  # noqa: SLF001
+        )
+
+    app.dependency_overrides[youtube.youtube_client_factory] = (
+        mocked_youtube_client_factory
+    )
+    try:
+        async with (
+            lifespan(app),
+            httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://bench",
+                headers={"x-api-key": "bench"},
+                # load tests measure (long) latencies, never time them out
+                timeout=None,  # noqa: S113
+            ) as client,
+        ):
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+
+
+@benchmark("http_endpoints")
+def bench_http_endpoints(ctx: Context) -> dict[str, Any]:
+    async def run() -> dict[str, Any]:
+        results = {}
+        transport = fixtures.make_youtube_transport(latency=0.005)
+        async with app_client(transport) as client:
+            for name, (method, url, kwargs) in _endpoint_cases(ctx).items():
+                await client.request(method, url, **kwargs)  # warmup
+                results[name] = await load_test(
+                    client,
+                    method,
+                    url,
+                    requests=ctx.size(200, 40),
+                    concurrency=16,
+                    **kwargs,
+                )
+        return results
+
+    return asyncio.run(run())
+
+
+def _rss_mb() -> float:
+    """Resident memory of this process, Linux only."""
+    with Path("/proc/self/statm").open() as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+
+
+@benchmark("analyse_large_video")
+def bench_analyse_large_video(ctx: Context) -> dict[str, Any]:
+    """Load test of ``/analyse/{video_id}`` with replies on a mocked video.
+
+    Threads have 9 replies each (5 embedded, so replies are paged through
+    ``comments.list``). Peak RSS above the baseline should stay flat as the
+    number of comments grows, because comments are aggregated in chunks.
+    """
+    import threading
+
+    async def run(n_comments: int) -> dict[str, Any]:
+        stats: dict[str, int] = {}
+        transport = fixtures.make_youtube_transport(
+            n_comments // 10,
+            replies_per_thread=9,
+            stats=stats,
+        )
+        async with app_client(transport) as client:
+            baseline = peak = _rss_mb()
+            done = threading.Event()
+
+            def sample() -> None:
+                nonlocal peak
+                while not done.wait(0.005):
+                    peak = max(peak, _rss_mb())
+
+            sampler = threading.Thread(target=sample)
+            sampler.start()
+            start = time.perf_counter()
+            response = await client.get(
+                f"/analyse/{fixtures.VIDEO_ID}",
+                params={"max_comments": n_comments, "include_replies": True},
+            )
+            total = time.perf_counter() - start
+            done.set()
+            sampler.join()
+        response.raise_for_status()
+        return {
+            "comments": response.json()["totalComments"],
+            "api_calls": stats["calls"],
+            "total_s": round(total, 3),
+            "comments_per_s": round(n_comments / total, 1),
+            "peak_rss_delta_mb": round(peak - baseline, 1),
+        }
+
+    if not Path("/proc/self/statm").exists():
+        return {"skipped": "RSS sampling needs /proc (Linux)."}
+    return {
+        f"comments_{n}": asyncio.run(run(n)) for n in (10_000, ctx.size(50_000, 20_000))
+    }
+
+
+# ------------------------------------------------------------------------------
+# Setup and CLI
+# ------------------------------------------------------------------------------
+
+
+def git_commit() -> str | None:
+    try:
+        # fixed command, only `git` is resolved from PATH
+        out = subprocess.run(  # noqa: S603
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def setup(ctx: Context) -> None:
+    """Point params and model URI at a temporary work directory.
+
+    Must run before ``ml`` or ``backend`` modules are imported because both
+    read their configuration at import time.
+    """
+    with Path("params.yaml").open() as f:
+        bench_params = yaml.safe_load(f)
+
+    raw_rows = ctx.size(50_000, 5_000)
+    raw_path = fixtures.write_raw_dataset(ctx.workdir / "raw.csv", raw_rows)
+    bench_params["dataset"]["url"] = raw_path.as_posix()
+    bench_params["ingestion"] = {
+        "processed_train_path": (ctx.workdir / "train.parquet").as_posix(),
+        "processed_test_path": (ctx.workdir / "test.parquet").as_posix(),
+    }
+    bench_params["pipeline"]["path"] = (ctx.workdir / "classifier.pkl").as_posix()
+
+    params_path = ctx.workdir / "params.yaml"
+    with params_path.open("w") as f:
+        yaml.safe_dump(bench_params, f)
+    os.environ["PARAMS_YAML_PATH"] = params_path.as_posix()
+    store_path = ctx.workdir / "analysis.sqlite3"
+    os.environ["ANALYSIS_STORE_PATH"] = store_path.as_posix()
+
+    # measure the code, not the YouTube API rate limit of batch endpoint
+    os.environ.setdefault("YOUTUBE_API_RATE_LIMIT", "100000")
+    os.environ.setdefault("YOUTUBE_API_RATE_BURST", "1000")
+
+    pipeline = fixtures.train_model()
+    model_uri = fixtures.save_model(pipeline, ctx.workdir / "model")
+    os.environ["MLFLOW_MODEL_URI"] = model_uri
+    ctx.extras.update(pipeline=pipeline, raw_rows=raw_rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    commit = git_commit()
+    output: Path = args.output or RESULTS_DIR / f"{commit or 'unknown'}.json"
+    names = args.only or list(BENCHMARKS)
+
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ctx = Context(workdir=Path(tmp_dir), quick=args.quick)
+        setup(ctx)
+        for name in names:
+            print(f"Running {name!r} benchmark...", file=sys.stderr)
+            start = time.perf_counter()
+            results[name] = BENCHMARKS[name](ctx)
+            print(f"  done in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    import polars as pl
+    import sklearn
+
+    report = {
+        "commit": commit,
+        "created_at": datetime.now(UTC).isoformat(),
+        "quick": args.quick,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {"polars": pl.__version__, "scikit-learn": sklearn.__version__},
+        "results": results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results stored at {output.as_posix()!r}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
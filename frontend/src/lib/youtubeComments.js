@@ -1,3 +1,35 @@
+/**
+ *  Fetches comments of a YouTube video and analyse their sentiments on server
+ *  side. Only `includeComments` full comment rows are returned along with the
+ *  aggregates.
+ */
+export async function analyseVideo(
+  videoId,
+  maxComments = 100,
+  order = "relevance",
+  includeComments = 20
+) {
+  try {
+    const response = await fetch(
+      `${import.meta.env.VITE_API_URL}/analyse/${videoId}?max_comments=${maxComments}&order=${order}&include_comments=${includeComments}`,
+      {
+        headers: {
+          "X-API-KEY": import.meta.env.VITE_YOUTUBE_API_KEY,
+        },
+      }
+    );
+    const data = await response.json();
+
+    if (!response.ok) {
+      throw new Error(JSON.stringify(data));
+    }
+
+    return data;
+  } catch (e) {
+    console.error(e);
+  }
+}
+
 /**
  *  Fetches comments from a YouTube video using videoId
  */
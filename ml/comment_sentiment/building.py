@@ -11,6 +11,7 @@ from loguru import logger
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import FunctionTransformer
 
+from ml.comment_sentiment.cascade import CascadeClassifier, calibration_offset
 from ml.params import params
 
 
@@ -34,6 +35,22 @@ def build_pipeline() -> Pipeline:
     model = getattr(module, params.model.name)(**params.model.params)
     logger.debug("{} imported from {} module.", params.model.name, params.model.module)
 
+    if params.cascade.enabled:
+        module = importlib.import_module(params.cascade.module)
+        fast = getattr(module, params.cascade.name)(**params.cascade.params)
+        logger.debug(
+            "{} cascaded in front of {}.",
+            params.cascade.name,
+            params.model.name,
+        )
+        # cascade densifies features of uncertain rows only
+        return Pipeline(
+            steps=[
+                ("vectorizer", vectorizer),
+                ("model", CascadeClassifier(fast, model, params.cascade.threshold)),
+            ],
+        )
+
     # convert sparse output of vectorizer into dense array
     to_dense = FunctionTransformer(
         lambda x: x.toarray(),
@@ -82,6 +99,14 @@ def main() -> None:
         params.ingestion.processed_train_path,
     )
 
+    if params.cascade.enabled:
+        n_rows = calibration_offset(train_df.height, params.cascade.calibration_size)
+        logger.debug(
+            "Holding out {} rows to calibrate cascade.",
+            train_df.height - n_rows,
+        )
+        train_df = train_df.head(n_rows)
+
     pipeline = build_pipeline()
     train_pipeline(pipeline, train_df["text"], train_df["target"])
 
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import numpy as np
+from scipy.sparse import issparse
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+
+
+def _to_dense(x):
+    return x.toarray() if issparse(x) else x
+
+
+def calibration_offset(n_rows: int, calibration_size: float) -> int:
+    """First row of the (shuffled) train data which is held out from fitting
+    the cascade to calibrate its threshold.
+    """
+    return n_rows - round(n_rows * calibration_size)
+
+
+class CascadeClassifier(ClassifierMixin, BaseEstimator):
+    """Two stage classifier over (sparse) vectorizer features.
+
+    The cheap `fast` model predicts every row and only rows whose highest class
+    probability is not above `threshold` are densified and passed to the `slow`
+    model. `threshold=1` sends every row to the `slow` model.
+    """
+
+    def __init__(self, fast, slow, threshold: float = 0.9) -> None:
+        self.fast = fast
+        self.slow = slow
+        self.threshold = threshold
+
+    def fit(self, x, y) -> CascadeClassifier:
+        self.fast_ = clone(self.fast).fit(x, y)
+        self.slow_ = clone(self.slow).fit(_to_dense(x), y)
+        if not np.array_equal(self.fast_.classes_, self.slow_.classes_):
+            raise ValueError("fast and slow models are fitted on different classes.")
+        self.classes_ = self.slow_.classes_
+        return self
+
+    def predict_proba(self, x) -> np.ndarray:
+        proba = self.fast_.predict_proba(x)
+        uncertain = np.flatnonzero(proba.max(axis=1) <= self.threshold)
+        if uncertain.size:
+            proba[uncertain] = self.slow_.predict_proba(_to_dense(x[uncertain]))
+        return proba
+
+    def predict(self, x) -> np.ndarray:
+        return self.classes_[self.predict_proba(x).argmax(axis=1)]
@@ -1,47 +1,375 @@
 from __future__ import annotations
 
 import json
+import multiprocessing
+import os
+import statistics
 import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import TYPE_CHECKING, Literal
+from typing import TYPE_CHECKING, Any, Literal
 
 import cloudpickle
 import mlflow
 import mlflow.sklearn
+import numpy as np
 import polars as pl
 import seaborn as sns
 from loguru import logger
 from matplotlib import pyplot as plt
 from mlflow.environment_variables import MLFLOW_TRACKING_URI
-from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.metrics import confusion_matrix
+from threadpoolctl import threadpool_limits
 
+from ml.comment_sentiment.cascade import CascadeClassifier, calibration_offset
 from ml.params import params
 
 if TYPE_CHECKING:
-    import numpy as np
+    from collections.abc import Callable, Iterable, Iterator
+
     from sklearn.pipeline import Pipeline
 
+# Pipeline loaded once per worker process by `_init_worker`
+_worker_model: Pipeline | None = None
+
+
+def _init_worker(model_path: str) -> None:
+    global _worker_model  # noqa: PLW0603
+    # Avoid oversubscription, parallelism comes from the process pool
+    threadpool_limits(limits=1)
+    with Path(model_path).open("rb") as f:
+        _worker_model = cloudpickle.load(f)
+
+
+def _read_chunk(data_path: str, offset: int, length: int) -> pl.DataFrame:
+    return (
+        pl.scan_parquet(data_path)
+        .select("text", "target")
+        .slice(offset, length)
+        .collect()
+    )
+
+
+def _score_chunk(
+    data_path: str,
+    offset: int,
+    length: int,
+    labels: list[int],
+) -> np.ndarray:
+    """Predict one chunk of the dataset and return its confusion matrix."""
+    if _worker_model is None:
+        raise RuntimeError("worker process is not initialized with a model.")
+    chunk = _read_chunk(data_path, offset, length)
+    y_pred = _worker_model.predict(chunk["text"])
+    return confusion_matrix(chunk["target"], y_pred, labels=labels)
+
+
+def cascade_counts(
+    target: np.ndarray,
+    confidence: np.ndarray,
+    fast_pred: np.ndarray,
+    slow_pred: np.ndarray,
+    thresholds: list[float],
+) -> dict[str, Any]:
+    """Count rows sent to the fast model and correct predictions of the cascade
+    at every threshold, so chunks are summed instead of kept in memory.
+    """
+    fast = confidence > np.asarray(thresholds)[:, None]
+    fast_correct = fast_pred == target
+    slow_correct = slow_pred == target
+    return {
+        "n_rows": len(target),
+        "slow_correct": int(slow_correct.sum()),
+        "fast_rows": fast.sum(axis=1),
+        "fast_correct": (fast & fast_correct).sum(axis=1),
+        "cascade_correct": np.where(fast, fast_correct, slow_correct).sum(axis=1),
+    }
+
+
+def _score_cascade_chunk(
+    data_path: str,
+    offset: int,
+    length: int,
+    thresholds: list[float],
+) -> dict[str, Any]:
+    """Predict one chunk with both models of the cascade separately, time each
+    of them and return `cascade_counts` at every threshold.
+    """
+    if _worker_model is None:
+        raise RuntimeError("worker process is not initialized with a model.")
+    chunk = _read_chunk(data_path, offset, length)
+    cascade: CascadeClassifier = _worker_model[-1]
+
+    start_time = time.perf_counter()
+    x = _worker_model[:-1].transform(chunk["text"])
+    features_s = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    proba = cascade.fast_.predict_proba(x)
+    fast_s = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    slow_pred = cascade.slow_.predict(x.toarray())
+    slow_s = time.perf_counter() - start_time
+
+    counts = cascade_counts(
+        chunk["target"].to_numpy(),
+        proba.max(axis=1),
+        cascade.classes_[proba.argmax(axis=1)],
+        slow_pred,
+        thresholds,
+    )
+    return {**counts, "fast_s": features_s + fast_s, "slow_s": features_s + slow_s}
+
+
+def _map_chunks(
+    model_path: str,
+    data_path: str,
+    fn: Callable[..., Any],
+    *args: Any,
+    start: int = 0,
+) -> Iterator[Any]:
+    """Call `fn(data_path, offset, length, *args)` for every chunk of the
+    dataset from `start` row across a process pool and yield the results as
+    they complete.
+    """
+    chunk_size: int = params.evaluation.chunk_size
+    n_jobs: int = params.evaluation.n_jobs or os.cpu_count() or 1
+    n_rows: int = pl.scan_parquet(data_path).select(pl.len()).collect().item()
+    logger.debug(
+        "Evaluating {} rows in chunks of {} with {} workers.",
+        n_rows - start,
+        chunk_size,
+        n_jobs,
+    )
+
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        # polars is not fork-safe, see https://docs.pola.rs/user-guide/misc/multiprocessing/
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_path,),
+    ) as executor:
+        futures = [
+            executor.submit(fn, data_path, offset, chunk_size, *args)
+            for offset in range(start, n_rows, chunk_size)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def classification_report_from_cm(
+    cm: np.ndarray,
+    target_names: Iterable[str],
+) -> dict:
+    """Build `sklearn.metrics.classification_report(output_dict=True)` from
+    confusion matrix counts (rows are actual and columns are predicted labels).
+    """
+    tp = np.diag(cm).astype(float)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+    _pr_sum = precision + recall
+    f1 = np.divide(
+        2 * precision * recall,
+        _pr_sum,
+        out=np.zeros_like(tp),
+        where=_pr_sum > 0,
+    )
+
+    report: dict = {
+        name: {
+            "precision": float(precision[i]),
+            "recall": float(recall[i]),
+            "f1-score": float(f1[i]),
+            "support": float(support[i]),
+        }
+        for i, name in enumerate(target_names)
+    }
+    total = support.sum()
+    report["accuracy"] = float(tp.sum() / total) if total else 0.0
+    report["macro avg"] = {
+        "precision": float(precision.mean()),
+        "recall": float(recall.mean()),
+        "f1-score": float(f1.mean()),
+        "support": float(total),
+    }
+    weights = support / total if total else np.zeros_like(tp)
+    report["weighted avg"] = {
+        "precision": float(precision @ weights),
+        "recall": float(recall @ weights),
+        "f1-score": float(f1 @ weights),
+        "support": float(total),
+    }
+    return report
+
 
 def evaluate(
-    model: Pipeline,
-    x_test: pl.Series,
-    y_test: pl.Series,
+    model_path: str,
+    data_path: str,
+    labels: list[int],
 ) -> tuple[dict, np.ndarray]:
-    y_pred = model.predict(x_test)
-
-    logger.debug("Calculating classification_report...")
-    report: dict = classification_report(
-        y_test,
-        y_pred,
-        output_dict=True,
+    """Evaluate model on a parquet dataset in chunks across a process pool.
+
+    Only the per-chunk confusion matrices are sent back and summed, so peak
+    memory depends on `params.evaluation.chunk_size` and `n_jobs`, not on the
+    size of the dataset.
+    """
+    cm = np.zeros((len(labels), len(labels)), dtype=np.int64)
+    for chunk_cm in _map_chunks(model_path, data_path, _score_chunk, labels):
+        cm += chunk_cm
+
+    logger.debug("Calculating classification_report from confusion_matrix...")
+    report = classification_report_from_cm(
+        cm,
         target_names=params.dataset.target_labels.values(),
-    )  # type: ignore
-    logger.debug("Calculating confusion_matrix...")
-    cm = confusion_matrix(y_test, y_pred)
-
+    )
     return report, cm
 
 
+def calibrate_cascade(
+    chunks: Iterable[dict[str, Any]],
+    thresholds: list[float],
+    max_accuracy_drop: float,
+) -> dict[str, float]:
+    """Choose the lowest of `thresholds` (which chunks are counted at) whose
+    cascade accuracy is within `max_accuracy_drop` of the slow model alone,
+    falling back to `1` (slow model only). Also reports accuracy and throughput
+    (rows per second of one worker) of both paths at the chosen threshold.
+    """
+    n_rows = slow_correct = 0
+    fast_rows = fast_correct = cascade_correct = np.zeros(len(thresholds), int)
+    fast_s = slow_s = 0.0
+    for chunk in chunks:
+        n_rows += chunk["n_rows"]
+        slow_correct += chunk["slow_correct"]
+        fast_rows = fast_rows + chunk["fast_rows"]
+        fast_correct = fast_correct + chunk["fast_correct"]
+        cascade_correct = cascade_correct + chunk["cascade_correct"]
+        fast_s += chunk["fast_s"]
+        slow_s += chunk["slow_s"]
+    if not n_rows:
+        raise ValueError("no rows are scored to calibrate the cascade.")
+
+    # slow model only, as if `threshold=1`
+    threshold, n_fast, n_fast_correct, n_correct = 1.0, 0, 0, slow_correct
+    for i in np.argsort(thresholds):
+        if cascade_correct[i] / n_rows >= slow_correct / n_rows - max_accuracy_drop:
+            threshold = thresholds[i]
+            n_fast, n_fast_correct = int(fast_rows[i]), int(fast_correct[i])
+            n_correct = int(cascade_correct[i])
+            break
+
+    n_slow = n_rows - n_fast
+    return {
+        "cascade_threshold": threshold,
+        "cascade_fast_fraction": n_fast / n_rows,
+        "cascade_fast_accuracy": n_fast_correct / n_fast if n_fast else 0.0,
+        "cascade_slow_accuracy": (
+            (n_correct - n_fast_correct) / n_slow if n_slow else 0.0
+        ),
+        "cascade_accuracy": n_correct / n_rows,
+        "cascade_slow_only_accuracy": slow_correct / n_rows,
+        "cascade_fast_rows_per_s": n_rows / fast_s,
+        "cascade_slow_rows_per_s": n_rows / slow_s,
+    }
+
+
+def calibrate_held_out_cascade(model_path: str) -> dict[str, float]:
+    """`calibrate_cascade` on the train rows held out by the building stage."""
+    data_path = params.ingestion.processed_train_path
+    thresholds: list[float] = params.evaluation.cascade.thresholds
+    n_rows = pl.scan_parquet(data_path).select(pl.len()).collect().item()
+    chunks = _map_chunks(
+        model_path,
+        data_path,
+        _score_cascade_chunk,
+        thresholds,
+        start=calibration_offset(n_rows, params.cascade.calibration_size),
+    )
+    return calibrate_cascade(
+        chunks,
+        thresholds,
+        params.evaluation.cascade.max_accuracy_drop,
+    )
+
+
+def measure_serving_cost(model_path: str, data_path: str) -> dict[str, float]:
+    """Measure load time, serialized size, predict latency and peak memory."""
+    serving = params.evaluation.serving
+    batch_sizes: list[int] = serving.batch_sizes
+    metrics: dict[str, float] = {
+        "serving_model_size_mb": Path(model_path).stat().st_size / 1024**2,
+    }
+
+    start_time = time.perf_counter()
+    with Path(model_path).open("rb") as f:
+        model: Pipeline = cloudpickle.load(f)
+    metrics["serving_load_time_s"] = time.perf_counter() - start_time
+
+    # load again to measure memory, as tracing slows down the load itself.
+    # `tracemalloc` also traces numpy allocations, which dominate the peak
+    tracemalloc.start()
+    with Path(model_path).open("rb") as f:
+        cloudpickle.load(f)
+    load_peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    metrics["serving_load_peak_memory_mb"] = load_peak_memory / 1024**2
+
+    texts = (
+        pl.scan_parquet(data_path)
+        .select("text")
+        .head(max(batch_sizes))
+        .collect()
+        .get_column("text")
+    )
+    if texts.is_empty():
+        raise ValueError(f"no rows found in {data_path!r} to measure latency.")
+    for batch_size in batch_sizes:
+        # repeat rows if the dataset is smaller than the batch
+        batch = pl.concat([texts] * -(-batch_size // texts.len())).head(batch_size)
+
+        model.predict(batch)  # warmup
+        samples = []
+        for _ in range(serving.repeat):
+            start_time = time.perf_counter()
+            model.predict(batch)
+            samples.append((time.perf_counter() - start_time) * 1000)
+        # inclusive method never extrapolates beyond the slowest sample
+        percentiles = statistics.quantiles(samples, n=100, method="inclusive")
+        metrics[f"serving_batch_{batch_size}_p50_ms"] = percentiles[49]
+        metrics[f"serving_batch_{batch_size}_p99_ms"] = percentiles[98]
+
+    tracemalloc.start()
+    model.predict(batch)  # largest batch is measured last
+    metrics["serving_predict_peak_memory_mb"] = (
+        tracemalloc.get_traced_memory()[1] / 1024**2
+    )
+    tracemalloc.stop()
+
+    return metrics
+
+
+def check_serving_thresholds(
+    metrics: dict[str, float],
+    thresholds: dict[str, float | None],
+) -> list[str]:
+    """Return violations of `params.evaluation.serving.thresholds` (max values)."""
+    violations = []
+    for name, limit in thresholds.items():
+        if limit is None:
+            continue
+        if name not in metrics:
+            violations.append(f"{name} is not measured, check serving.batch_sizes.")
+        elif metrics[name] > limit:
+            violations.append(f"{name}={metrics[name]:.3f} exceeds limit {limit}.")
+    return violations
+
+
 def log_confusion_matrix(
     cm: np.ndarray,
     dataset_type: Literal["train", "test"],
@@ -67,7 +395,7 @@ def log_confusion_matrix(
 
     # Save confusion matrix plot as a file and log it to MLflow
     with tempfile.TemporaryDirectory() as tmp_dir:
-        tmp_fp = Path(tmp_dir) / "confusion_matrix.png"
+        tmp_fp = Path(tmp_dir) / f"{dataset_type}_confusion_matrix.png"
         plt.savefig(tmp_fp)
         mlflow.log_artifact(tmp_fp.as_posix())
 
@@ -92,7 +420,7 @@ def log_classification_report(
                     f"{dataset_type}_{label}_f1-score": metrics["f1-score"],
                 },
             )
-    mlflow.log_metric("test_accuracy", report["accuracy"])
+    mlflow.log_metric(f"{dataset_type}_accuracy", report["accuracy"])
 
 
 def log_models(model) -> None:
@@ -121,9 +449,6 @@ def store_mllfow_run_info(run: mlflow.ActiveRun) -> None:
 
 
 def main() -> None:
-    import os
-    import time
-
     import dagshub
 
     logger.critical("Model evaluation starts...")
@@ -141,19 +466,61 @@ def main() -> None:
     with Path(params.pipeline.path).open("rb") as f:
         pipeline = cloudpickle.load(f)
 
-    logger.debug(
-        "Loading test data from {!r} file.",
-        params.ingestion.processed_test_path,
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = params.pipeline.path
+        cascade_metrics = {}
+        if isinstance(pipeline[-1], CascadeClassifier):
+            logger.debug("Calibrating cascade threshold on held out train data...")
+            cascade_metrics = calibrate_held_out_cascade(model_path)
+            logger.info("Cascade calibrated: {}", cascade_metrics)
+            pipeline.set_params(model__threshold=cascade_metrics["cascade_threshold"])
+            # evaluate and serve the calibrated pipeline
+            model_path = (Path(tmp_dir) / "classifier.pkl").as_posix()
+            with Path(model_path).open("wb") as f:
+                cloudpickle.dump(pipeline, f)
+
+        labels = pipeline.classes_.tolist()
+        datasets: dict[Literal["train", "test"], str] = {
+            "train": params.ingestion.processed_train_path,
+            "test": params.ingestion.processed_test_path,
+        }
+        results = {}
+        for dataset_type, data_path in datasets.items():
+            logger.debug(
+                "Evaluating on {} data from {!r} file.",
+                dataset_type,
+                data_path,
+            )
+            results[dataset_type] = evaluate(model_path, data_path, labels)
+
+        logger.debug("Measuring serving cost of the pipeline...")
+        serving_metrics = measure_serving_cost(
+            model_path,
+            params.ingestion.processed_test_path,
+        )
+    violations = check_serving_thresholds(
+        serving_metrics,
+        params.evaluation.serving.thresholds,
     )
-    test_df = pl.read_parquet(params.ingestion.processed_test_path)
-
-    report, cm = evaluate(pipeline, test_df["text"], test_df["target"])
 
     logger.critical("Mlflow tracking URI is {!r}", MLFLOW_TRACKING_URI.get())
     with mlflow.start_run() as run:
         logger.critical("Started new mlflow run: {!r}", run.info.run_id)
-        log_confusion_matrix(cm, "test")
-        log_classification_report(report, "test")
+        for dataset_type, (report, cm) in results.items():
+            log_confusion_matrix(cm, dataset_type)
+            log_classification_report(report, dataset_type)
+        if cascade_metrics:
+            logger.info("Logging cascade metrics...")
+            mlflow.log_metrics(cascade_metrics)
+            mlflow.set_tag("cascade_model_name", params.cascade.name)
+        logger.info("Logging serving cost metrics...")
+        mlflow.log_metrics(serving_metrics)
+        mlflow.set_tag("serving_gate", "failed" if violations else "passed")
+        if violations:
+            # Do not log the model, so it can't be promoted to MLFLOW_MODEL_URI
+            raise RuntimeError(
+                "Serving cost gate failed:\n" + "\n".join(violations),
+            )
         log_models(pipeline)
         store_mllfow_run_info(run)
 
@@ -0,0 +1,66 @@
+"""Tests for the cascade classifier"""
+
+import numpy as np
+import polars as pl
+import pytest
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from .cascade import CascadeClassifier
+
+
+@pytest.fixture(scope="module")
+def features():
+    rng = np.random.default_rng(0)
+    words = {
+        -1: ["bad", "hate", "worst", "boring"],
+        0: ["video", "today", "channel", "music"],
+        1: ["great", "love", "best", "awesome"],
+    }
+    y = rng.choice([-1, 0, 1], size=300)
+    texts = [
+        " ".join(rng.choice(words[i] + words[rng.choice([-1, 0, 1])], size=4))
+        for i in y
+    ]
+    return TfidfVectorizer().fit_transform(pl.Series(texts)), y
+
+
+@pytest.fixture(scope="module")
+def cascade(features):
+    x, y = features
+    return CascadeClassifier(
+        LogisticRegression(),
+        HistGradientBoostingClassifier(max_iter=20),
+    ).fit(x, y)
+
+
+@pytest.mark.parametrize(
+    ("threshold", "expected"),
+    [(0.0, "fast_"), (1.0, "slow_")],
+)
+def test_cascade_thresholds(cascade, features, threshold, expected):
+    x, _ = features
+    cascade.set_params(threshold=threshold)
+    model = getattr(cascade, expected)
+    x_expected = x.toarray() if expected == "slow_" else x
+    np.testing.assert_allclose(
+        cascade.predict_proba(x),
+        model.predict_proba(x_expected),
+    )
+    assert (cascade.predict(x) == model.predict(x_expected)).all()
+
+
+def test_cascade_routes_uncertain_rows(cascade, features):
+    x, _ = features
+    fast_proba = cascade.fast_.predict_proba(x)
+    cascade.set_params(threshold=float(np.median(fast_proba.max(axis=1))))
+    proba = cascade.predict_proba(x)
+
+    fast = fast_proba.max(axis=1) > cascade.threshold
+    assert 0 < fast.sum() < len(fast)
+    np.testing.assert_allclose(proba[fast], fast_proba[fast])
+    np.testing.assert_allclose(
+        proba[~fast],
+        cascade.slow_.predict_proba(x[np.flatnonzero(~fast)].toarray()),
+    )
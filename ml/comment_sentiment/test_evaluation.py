@@ -0,0 +1,89 @@
+"""Tests for chunked model evaluation"""
+
+import numpy as np
+import pytest
+from sklearn.metrics import classification_report, confusion_matrix
+
+from .evaluation import (
+    calibrate_cascade,
+    cascade_counts,
+    check_serving_thresholds,
+    classification_report_from_cm,
+)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_classification_report_from_cm_matches_sklearn(seed: int):
+    rng = np.random.default_rng(seed)
+    y_true = rng.choice([-1, 0, 1], size=500)
+    y_pred = np.where(rng.random(500) < 0.7, y_true, rng.choice([-1, 0, 1], 500))
+    target_names = ["neg", "neu", "pos"]
+
+    # confusion matrix of whole data is the sum of its chunks
+    cm = sum(
+        confusion_matrix(y_true[i : i + 64], y_pred[i : i + 64], labels=[-1, 0, 1])
+        for i in range(0, 500, 64)
+    )
+    assert (cm == confusion_matrix(y_true, y_pred)).all()
+
+    expected = classification_report(
+        y_true,
+        y_pred,
+        output_dict=True,
+        target_names=target_names,
+    )
+    report = classification_report_from_cm(cm, target_names)
+    assert report.keys() == expected.keys()
+    assert report["accuracy"] == pytest.approx(expected["accuracy"])
+    for label in [*target_names, "macro avg", "weighted avg"]:
+        assert report[label] == pytest.approx(expected[label])
+
+
+def test_check_serving_thresholds():
+    metrics = {"serving_load_time_s": 1.5, "serving_batch_1_p99_ms": 80.0}
+    thresholds = {
+        "serving_load_time_s": 2,
+        "serving_batch_1_p99_ms": 50,
+        "serving_model_size_mb": None,
+        "serving_batch_10_p99_ms": 100,
+    }
+    violations = check_serving_thresholds(metrics, thresholds)
+    assert len(violations) == 2
+    assert violations[0].startswith("serving_batch_1_p99_ms=80.000 exceeds")
+    assert violations[1].startswith("serving_batch_10_p99_ms is not measured")
+
+
+def test_calibrate_cascade():
+    target = np.array([1, 1, 0, 0, -1, -1, 1, 0])
+    slow_pred = target.copy()
+    slow_pred[-1] = 1  # slow model is 7/8 accurate
+    fast_pred = np.array([1, 1, 0, 1, -1, 0, 0, 0])
+    confidence = np.array([0.99, 0.95, 0.9, 0.6, 0.85, 0.55, 0.5, 0.7])
+    thresholds = [0.9, 0.5, 0.8, 0.6]
+
+    def chunks(thresholds):
+        for i in (0, 4):
+            counts = cascade_counts(
+                target[i : i + 4],
+                confidence[i : i + 4],
+                fast_pred[i : i + 4],
+                slow_pred[i : i + 4],
+                thresholds,
+            )
+            yield {**counts, "fast_s": 0.1, "slow_s": 1.0}
+
+    metrics = calibrate_cascade(chunks(thresholds), thresholds, max_accuracy_drop=0)
+    # at 0.5 two wrong fast predictions are used
+    assert metrics["cascade_threshold"] == 0.6
+    assert metrics["cascade_fast_fraction"] == 5 / 8
+    assert metrics["cascade_fast_accuracy"] == 1
+    assert metrics["cascade_slow_accuracy"] == 1
+    assert metrics["cascade_accuracy"] == 1
+    assert metrics["cascade_slow_only_accuracy"] == 7 / 8
+    assert metrics["cascade_fast_rows_per_s"] == pytest.approx(40)
+    assert metrics["cascade_slow_rows_per_s"] == pytest.approx(4)
+
+    # no candidate keeps accuracy, so every row goes to slow model
+    metrics = calibrate_cascade(chunks([0.5]), [0.5], max_accuracy_drop=0)
+    assert metrics["cascade_threshold"] == 1
+    assert metrics["cascade_fast_fraction"] == 0